@@ -85,6 +85,9 @@ class FieldWorkForceSafetyMainStack(Stack):
                 agent_alias_id=bedrock_agents_stack.supervisor_agent_alias_id,
                 work_order_table_name=bedrock_agents_stack.work_orders_table_name,
                 location_table_name=bedrock_agents_stack.locations_table_name,
+                work_order_table_stream_arn=bedrock_agents_stack.work_orders_table_stream_arn,
+                location_table_stream_arn=bedrock_agents_stack.locations_table_stream_arn,
+                data_bucket_name=bedrock_agents_stack.data_bucket_name,
             )
             # Add dependency to ensure Bedrock Agents stack is created first
             backend_stack.add_dependency(bedrock_agents_stack)
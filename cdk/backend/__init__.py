@@ -16,6 +16,7 @@ import core_constructs as coreconstructs
 from .workorderlistflow import WorkOrderApiStack
 from .vicemergencyflow import VicEmergencyStack
 from .safetycheckflow import WebSocketApiStack
+from .worklistflow import WorklistStack
 
 EMBEDDINGS_SIZE = 512
 
@@ -30,6 +31,9 @@ class BackendStack(NestedStack):
         agent_alias_id: str,
         work_order_table_name:  str,
         location_table_name: str,
+        data_bucket_name: str = None,
+        work_order_table_stream_arn: str = None,
+        location_table_stream_arn: str = None,
         language_code: str = "en",
         **kwargs
     ) -> None:
@@ -53,15 +57,54 @@ class BackendStack(NestedStack):
             "WorkOrderApiGateway",
             region=self.region,
             user_pool=self.cognito.user_pool,
+            # Gzipped JSON from the work order Lambda is passed through as binary
+            binary_media_types=["application/json"],
         )
 
+        # Safety briefings are kept out of the WorkOrders items so list scans stay small
+        self.briefings_table = coreconstructs.CoreTable(
+            self,
+            "BriefingsTable",
+            partition_key=dynamodb.Attribute(
+                name="work_order_id", type=dynamodb.AttributeType.STRING
+            ),
+        )
+
+        # Append-only, compressed history of every distinct briefing per work order
+        self.briefing_history_table = coreconstructs.CoreTable(
+            self,
+            "BriefingHistoryTable",
+            partition_key=dynamodb.Attribute(
+                name="work_order_id", type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="created_at", type=dynamodb.AttributeType.STRING
+            ),
+        )
+
+        # Per-technician daily worklists maintained from the source table streams
+        self.worklist_stack = None
+        if work_order_table_stream_arn and location_table_stream_arn:
+            self.worklist_stack = WorklistStack(
+                self,
+                "WorklistStack",
+                dynamo_db_workorder_table=work_order_table_name,
+                dynamo_db_location_table=location_table_name,
+                workorder_table_stream_arn=work_order_table_stream_arn,
+                location_table_stream_arn=location_table_stream_arn,
+            )
+
         # Fetch WorkOrders flow
         self.workorder_workflow = WorkOrderApiStack(
             self,
             "WorkOrdersAPI",
             api_gateway=self.apigw_workorder,
             dynamo_db_workorder_table=work_order_table_name,
-            dynamo_db_location_table=location_table_name
+            dynamo_db_location_table=location_table_name,
+            dynamo_db_briefings_table=self.briefings_table.table_name,
+            dynamo_db_briefing_history_table=self.briefing_history_table.table_name,
+            data_bucket_name=data_bucket_name,
+            dynamo_db_worklist_table=self.worklist_stack.worklist_table.table_name if self.worklist_stack else None,
         )
 
         # Emergency Warnings flow
@@ -82,6 +125,9 @@ class BackendStack(NestedStack):
             user_pool=self.cognito.user_pool.user_pool_id,
             client_id=self.cognito.user_pool_client.user_pool_client_id,
             work_order_table_name=work_order_table_name,
+            briefings_table_name=self.briefings_table.table_name,
+            briefing_history_table_name=self.briefing_history_table.table_name,
+            data_bucket_name=data_bucket_name,
         )
 
         # Store outputs as properties for easy access by the frontend stack
@@ -11,7 +11,9 @@ from aws_cdk import (
     RemovalPolicy,
     aws_dynamodb as dynamodb,
     aws_cognito as cognito,
-    aws_logs as logs
+    aws_logs as logs,
+    aws_sqs as sqs,
+    aws_lambda_event_sources as lambda_event_sources,
 )
 from constructs import Construct
 
@@ -32,6 +34,9 @@ class WebSocketApiStack(Construct):
         user_pool= str,
         client_id= str,
         work_order_table_name: str = None,
+        briefings_table_name: str = None,
+        briefing_history_table_name: str = None,
+        data_bucket_name: str = None,
     ) -> None:
         super().__init__(scope, construct_id)
 
@@ -44,8 +49,57 @@ class WebSocketApiStack(Construct):
                 name="connectionId", type=dynamodb.AttributeType.STRING
             ),
             # CoreTable already sets removal_policy=RemovalPolicy.DESTROY
+            # Rows expire unless heartbeats keep extending the ttl
+            time_to_live_attribute="ttl",
+        )
+        # Find a user's open sockets for server-side pushes
+        web_socket_table.add_global_secondary_index(
+            index_name="UserIndex",
+            partition_key=dynamodb.Attribute(
+                name="userSub",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["ttl", "email"]
+        )
+
+        # Single-flight leases so concurrent checks of the same work order share one agent run,
+        # plus the admission slots that cap concurrent agent runs
+        lease_table = core.CoreTable(
+            self,
+            "SafetyCheckLeaseTable",
+            partition_key=dynamodb.Attribute(
+                name="lease_key", type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="ttl",
         )
 
+        # Optional job mode: $default enqueues safety checks and a worker consumes them
+        job_mode = str(self.node.try_get_context("safety_check_job_mode") or "no").lower() == "yes"
+        worker_max_concurrency = int(self.node.try_get_context("safety_check_worker_max_concurrency") or 5)
+        # Concurrent agent runs admitted per user and across the fleet
+        admission_user_limit = int(self.node.try_get_context("safety_check_user_limit") or 2)
+        admission_global_limit = int(self.node.try_get_context("safety_check_global_limit") or 20)
+
+        job_queue = None
+        if job_mode:
+            job_dead_letter_queue = sqs.Queue(
+                self,
+                "SafetyCheckJobDLQ",
+                encryption=sqs.QueueEncryption.SQS_MANAGED,
+                enforce_ssl=True,
+                retention_period=Duration.days(4),
+            )
+            job_queue = sqs.Queue(
+                self,
+                "SafetyCheckJobQueue",
+                encryption=sqs.QueueEncryption.SQS_MANAGED,
+                enforce_ssl=True,
+                # Must exceed the worker timeout so in-flight jobs are not redelivered
+                visibility_timeout=Duration.seconds(6 * 180),
+                dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=2, queue=job_dead_letter_queue),
+            )
+
         # Define function name first
         function_name = f"{construct_id.lower()}-safety-check"
         
@@ -57,6 +111,38 @@ class WebSocketApiStack(Construct):
             retention=logs.RetentionDays.ONE_WEEK,
             removal_policy=RemovalPolicy.DESTROY
         )
+        function_environment = {
+            "WS_CONNECTION_TABLE_NAME": web_socket_table.table_name,  # Use the actual table name
+            "CLIENT_ID": client_id,
+            "USER_POOL_ID": user_pool,
+            "REGION": region,
+            "AGENT_ID": agent_id,
+            "AGENT_ALIAS_ID": agent_alias_id,
+            "WORK_ORDERS_TABLE_NAME": work_order_table_name,  # Add WorkOrders table name
+            "APIGW_MAX_POOL_CONNECTIONS": "25",  # Sized for trace fan-out
+            "SAFETY_CHECK_LEASE_TABLE_NAME": lease_table.table_name,
+            "ADMISSION_USER_LIMIT": str(admission_user_limit),
+            "ADMISSION_GLOBAL_LIMIT": str(admission_global_limit),
+            "ADMISSION_MAX_WAIT_SECONDS": "60",
+        }
+        if briefings_table_name:
+            function_environment["BRIEFINGS_TABLE_NAME"] = briefings_table_name
+        if briefing_history_table_name:
+            function_environment["BRIEFING_HISTORY_TABLE_NAME"] = briefing_history_table_name
+        if data_bucket_name:
+            # Briefings above the threshold are stored in the data bucket
+            function_environment["BRIEFING_BUCKET_NAME"] = data_bucket_name
+            function_environment["BRIEFING_OFFLOAD_THRESHOLD_BYTES"] = "100000"
+
+        # The worker runs the checks with the same settings, but never enqueues
+        worker_environment = dict(function_environment)
+        if job_mode:
+            function_environment["SAFETY_CHECK_JOB_MODE"] = "true"
+            function_environment["SAFETY_CHECK_JOB_QUEUE_URL"] = job_queue.queue_url
+
+        # briefing_history lives in the shared code layer, the work orders function uses it too
+        shared_code_layer = core.CoreSharedCodeLayer(self, "SafetyCheckSharedCode")
+
         # a lambda function process the customer's question
         web_socket_fn = lambda_python.PythonFunction(
             self,
@@ -68,17 +154,11 @@ class WebSocketApiStack(Construct):
             runtime=lambda_.Runtime.PYTHON_3_13,
             timeout=Duration.seconds(180),
             memory_size=512,
-            environment={
-                "WS_CONNECTION_TABLE_NAME": web_socket_table.table_name,  # Use the actual table name
-                "CLIENT_ID": client_id,
-                "USER_POOL_ID": user_pool,
-                "REGION": region,
-                "AGENT_ID": agent_id,
-                "AGENT_ALIAS_ID": agent_alias_id,
-                "WORK_ORDERS_TABLE_NAME": work_order_table_name,  # Add WorkOrders table name
-            },
+            layers=[shared_code_layer],
+            environment=function_environment,
         )
         web_socket_fn.node.add_dependency(safety_check_log_group)
+
         web_socket_fn_policy = iam.Policy(
             self, 
             "WebSocketFnPolicy",
@@ -105,7 +185,11 @@ class WebSocketApiStack(Construct):
                 ],
                 resources=[
                     web_socket_table.table_arn,
-                    f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{work_order_table_name}" if work_order_table_name else "*"
+                    f"{web_socket_table.table_arn}/index/*",
+                    lease_table.table_arn,
+                    f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{work_order_table_name}" if work_order_table_name else "*",
+                    f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{briefings_table_name}" if briefings_table_name else "*",
+                    f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{briefing_history_table_name}" if briefing_history_table_name else "*",
                 ],
             ),
             iam.PolicyStatement(
@@ -149,6 +233,19 @@ class WebSocketApiStack(Construct):
             ),
         )
 
+        if data_bucket_name:
+            web_socket_fn_policy.add_statements(
+                iam.PolicyStatement(
+                    sid="BriefingObjectAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "s3:GetObject",
+                        "s3:PutObject",
+                    ],
+                    resources=[f"arn:aws:s3:::{data_bucket_name}/briefings/*"],
+                ),
+            )
+
         # Attach the IAM policy to the Lambda function's role
         web_socket_fn.role.attach_inline_policy(web_socket_fn_policy)
 
@@ -174,26 +271,135 @@ class WebSocketApiStack(Construct):
         # Expose the WebSocket API endpoint for other stacks to use
         self.websocket_api_endpoint = self.websocket_api.websocket_api_endpoint
 
-        NagSuppressions.add_resource_suppressions(
-            web_socket_fn,
-            [
-                {
-                    "id": "AwsSolutions-IAM5",
-                    "reason": """Certain policies will implement wildcard permissions to expedite development. 
-            TODO: Replace on Production environment (Path to Production)""",
-                },
-                {
-                    "id": "AwsSolutions-IAM4",
-                    "reason": """Prototype will use managed policies to expedite development. 
-                        TODO: Replace on Production environment (Path to Production)""",
-                    "appliesTo": [
-                        "Policy::arn:<AWS::Partition>:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+        functions = [web_socket_fn]
+        if job_mode:
+            job_queue.grant_send_messages(web_socket_fn)
+
+            # Worker that consumes queued safety-check jobs
+            worker_function_name = f"{construct_id.lower()}-safety-check-worker"
+            safety_check_worker_log_group = logs.LogGroup(
+                self,
+                "SafetyCheckWorkerLogGroup",
+                log_group_name=f"/aws/lambda/{worker_function_name}",
+                retention=logs.RetentionDays.ONE_WEEK,
+                removal_policy=RemovalPolicy.DESTROY
+            )
+            safety_check_worker_fn = lambda_python.PythonFunction(
+                self,
+                "SafetyCheckWorker",
+                function_name=worker_function_name,
+                entry=f"{os.path.dirname(os.path.realpath(__file__))}/lambda",
+                index="worker.py",
+                handler="lambda_handler",
+                runtime=lambda_.Runtime.PYTHON_3_13,
+                timeout=Duration.seconds(180),
+                memory_size=512,
+                layers=[shared_code_layer],
+                environment=worker_environment,
+            )
+            safety_check_worker_fn.node.add_dependency(safety_check_worker_log_group)
+            safety_check_worker_fn.add_event_source(
+                lambda_event_sources.SqsEventSource(
+                    job_queue,
+                    batch_size=1,
+                    max_concurrency=worker_max_concurrency,
+                    report_batch_item_failures=True,
+                )
+            )
+
+            # The worker only runs checks: no token verification, user lookups or enqueueing
+            safety_check_worker_fn_policy = iam.Policy(self, "SafetyCheckWorkerFnPolicy")
+            safety_check_worker_fn_policy.add_statements(
+                iam.PolicyStatement(
+                    sid="DynamoDBAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "dynamodb:GetItem",
+                        "dynamodb:Query",
+                        "dynamodb:PutItem",
+                        "dynamodb:UpdateItem",
+                        "dynamodb:DeleteItem"
                     ],
-                },
-                {
-                    "id": "AwsSolutions-L1",
-                    "reason": """Policy managed by AWS can not specify a different runtime version""",
-                },
-            ],
-            True,
-        )
+                    resources=[
+                        web_socket_table.table_arn,
+                        lease_table.table_arn,
+                        f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{work_order_table_name}" if work_order_table_name else "*",
+                        f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{briefings_table_name}" if briefings_table_name else "*",
+                        f"arn:aws:dynamodb:{region}:{Stack.of(self).account}:table/{briefing_history_table_name}" if briefing_history_table_name else "*",
+                    ],
+                ),
+                iam.PolicyStatement(
+                    sid="CloudWatchLogsAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "logs:CreateLogStream",
+                        "logs:PutLogEvents",
+                    ],
+                    resources=[safety_check_worker_log_group.log_group_arn],
+                ),
+                iam.PolicyStatement(
+                    sid="BedrockAgentAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=["bedrock:InvokeAgent"],
+                    resources=[agent_alias_arn],
+                ),
+                # The worker pushes frames back to the originating connection
+                iam.PolicyStatement(
+                    sid="WebSocketManageConnections",
+                    effect=iam.Effect.ALLOW,
+                    actions=['execute-api:ManageConnections'],
+                    resources=[
+                        f'arn:aws:execute-api:{region}:{Stack.of(self).account}:{self.websocket_api.api_id}/{self.websocket_api.stage.stage_name}/*'
+                    ]
+                ),
+            )
+            if data_bucket_name:
+                safety_check_worker_fn_policy.add_statements(
+                    iam.PolicyStatement(
+                        sid="BriefingObjectAccess",
+                        effect=iam.Effect.ALLOW,
+                        actions=[
+                            "s3:GetObject",
+                            "s3:PutObject",
+                        ],
+                        resources=[f"arn:aws:s3:::{data_bucket_name}/briefings/*"],
+                    ),
+                )
+            safety_check_worker_fn.role.attach_inline_policy(safety_check_worker_fn_policy)
+
+            NagSuppressions.add_resource_suppressions(
+                safety_check_worker_fn_policy,
+                [
+                    NagPackSuppression(
+                        id="AwsSolutions-IAM5",
+                        reason="Briefing objects are written under the briefings/ prefix and frames are posted to any connection of the stage.",
+                    )
+                ],
+                True,
+            )
+            functions.append(safety_check_worker_fn)
+
+        for fn in functions:
+            NagSuppressions.add_resource_suppressions(
+                fn,
+                [
+                    {
+                        "id": "AwsSolutions-IAM5",
+                        "reason": """Certain policies will implement wildcard permissions to expedite development. 
+                TODO: Replace on Production environment (Path to Production)""",
+                    },
+                    {
+                        "id": "AwsSolutions-IAM4",
+                        "reason": """Prototype will use managed policies to expedite development. 
+                            TODO: Replace on Production environment (Path to Production)""",
+                        "appliesTo": [
+                            "Policy::arn:<AWS::Partition>:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+                        ],
+                    },
+                    {
+                        "id": "AwsSolutions-L1",
+                        "reason": """Policy managed by AWS can not specify a different runtime version""",
+                    },
+                ],
+                True,
+            )
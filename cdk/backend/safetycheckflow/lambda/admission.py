@@ -0,0 +1,265 @@
+import os
+import time
+import random
+import threading
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+SLOT_PREFIX = 'admission'
+QUEUE_COUNTER_KEY = f'{SLOT_PREFIX}#queue'
+
+
+class InMemoryAdmissionController:
+    """
+    Process-local admission controller with the same interface as
+    DynamoDBAdmissionController. Used when no lease table is configured and for
+    local testing.
+    """
+
+    def __init__(self, user_limit: int, global_limit: int):
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self._running = {}
+        self._issued = 0
+        self._served = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, user: str, owner: str, ttl_seconds: int) -> bool:
+        now = time.time()
+        with self._lock:
+            self._running = {k: v for k, v in self._running.items() if v[1] > now}
+            user_running = sum(1 for running_user, _ in self._running.values() if running_user == user)
+            if user_running >= self.user_limit or len(self._running) >= self.global_limit:
+                return False
+            self._running[owner] = (user, now + ttl_seconds)
+            return True
+
+    def release(self, user: str, owner: str):
+        with self._lock:
+            self._running.pop(owner, None)
+
+    def take_ticket(self) -> int:
+        with self._lock:
+            self._issued += 1
+            return self._issued
+
+    def position(self, ticket: int) -> int:
+        with self._lock:
+            return max(1, ticket - self._served)
+
+    def ticket_done(self):
+        with self._lock:
+            self._served += 1
+
+
+class DynamoDBAdmissionController:
+    """
+    Admission controller backed by the single-flight lease table.
+
+    Each limit is one pool item (admission#global and admission#user#<user>)
+    holding a running count and a holders map of owner -> lease expiry. A run
+    is admitted by probing both pools with a read, global first, and then
+    claiming a place in each with a conditional update on the count. While the
+    global pool is full a waiting request costs one read per poll and no
+    writes. Expired holders are pruned when a full pool is probed, so crashed
+    runs give their capacity back on their own.
+    Waiting requests draw a ticket from a shared counter; their queue position
+    is the number of tickets issued before theirs that are still waiting.
+    """
+
+    def __init__(self, table, user_limit: int, global_limit: int):
+        self._table = table
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        # Pool items held by runs in this process, keyed by owner
+        self._held = {}
+        # Pool items known to exist, so they are only created once per container
+        self._pools = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pool_key(scope: str) -> str:
+        return f"{SLOT_PREFIX}#{scope}"
+
+    def _ensure_pool(self, pool_key: str):
+        if pool_key in self._pools:
+            return
+        try:
+            self._table.put_item(
+                Item={'lease_key': pool_key, 'running': 0, 'holders': {}},
+                ConditionExpression="attribute_not_exists(lease_key)"
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        self._pools.add(pool_key)
+
+    def _probe(self, pool_key: str, limit: int, now: int) -> bool:
+        """True if the pool has room, pruning expired holders from a full pool."""
+        item = self._table.get_item(
+            Key={'lease_key': pool_key},
+            ConsistentRead=True
+        ).get('Item')
+        if item is None:
+            self._pools.discard(pool_key)
+            return True
+        self._pools.add(pool_key)
+        if int(item.get('running', 0)) < limit:
+            return True
+        holders = item.get('holders', {})
+        expired = {owner: expires_at for owner, expires_at in holders.items() if int(expires_at) < now}
+        for owner, expires_at in expired.items():
+            logger.warning(f"Pruning expired admission holder {owner} from {pool_key}")
+            self._drop(pool_key, owner, expires_at)
+        return len(holders) - len(expired) < limit
+
+    def _claim(self, pool_key: str, limit: int, owner: str, ttl_seconds: int) -> bool:
+        self._ensure_pool(pool_key)
+        try:
+            self._table.update_item(
+                Key={'lease_key': pool_key},
+                UpdateExpression="SET holders.#owner = :expires_at ADD running :one",
+                ConditionExpression="running < :limit AND attribute_not_exists(holders.#owner)",
+                ExpressionAttributeNames={'#owner': owner},
+                ExpressionAttributeValues={
+                    ':expires_at': int(time.time()) + ttl_seconds,
+                    ':one': 1,
+                    ':limit': limit,
+                }
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return False
+
+    def _drop(self, pool_key: str, owner: str, expires_at=None):
+        """Remove a holder, only if its lease is still the one that was seen when expires_at is given."""
+        if expires_at is None:
+            condition = "attribute_exists(holders.#owner)"
+            values = {':minus_one': -1}
+        else:
+            condition = "holders.#owner = :expires_at"
+            values = {':minus_one': -1, ':expires_at': expires_at}
+        try:
+            self._table.update_item(
+                Key={'lease_key': pool_key},
+                UpdateExpression="REMOVE holders.#owner ADD running :minus_one",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={'#owner': owner},
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def try_acquire(self, user: str, owner: str, ttl_seconds: int) -> bool:
+        now = int(time.time())
+        global_key = self._pool_key("global")
+        user_key = self._pool_key(f"user#{user}")
+        # Probe with reads first so a full pool costs no failed writes
+        if not self._probe(global_key, self.global_limit, now):
+            return False
+        if not self._probe(user_key, self.user_limit, now):
+            return False
+        if not self._claim(global_key, self.global_limit, owner, ttl_seconds):
+            return False
+        if not self._claim(user_key, self.user_limit, owner, ttl_seconds):
+            self._drop(global_key, owner)
+            return False
+        with self._lock:
+            self._held[owner] = (user_key, global_key)
+        return True
+
+    def release(self, user: str, owner: str):
+        with self._lock:
+            pools = self._held.pop(owner, None)
+        if not pools:
+            return
+        for pool_key in pools:
+            self._drop(pool_key, owner)
+
+    def take_ticket(self) -> int:
+        response = self._table.update_item(
+            Key={'lease_key': QUEUE_COUNTER_KEY},
+            UpdateExpression="ADD issued :one",
+            ExpressionAttributeValues={':one': 1},
+            ReturnValues="UPDATED_NEW"
+        )
+        return int(response['Attributes']['issued'])
+
+    def position(self, ticket: int) -> int:
+        item = self._table.get_item(
+            Key={'lease_key': QUEUE_COUNTER_KEY},
+            ProjectionExpression="served",
+            ConsistentRead=True
+        ).get('Item', {})
+        return max(1, ticket - int(item.get('served', 0)))
+
+    def ticket_done(self):
+        self._table.update_item(
+            Key={'lease_key': QUEUE_COUNTER_KEY},
+            UpdateExpression="ADD served :one",
+            ExpressionAttributeValues={':one': 1}
+        )
+
+
+class Admission:
+    """
+    Waits for a run slot, reporting the queue position through on_queued(position)
+    whenever it changes. Returns True once admitted, or False if max_wait_seconds
+    elapses or should_abort() becomes true first.
+    """
+
+    def __init__(self, controller, user: str, owner: str, ttl_seconds: int,
+                 max_wait_seconds: float, poll_seconds: float):
+        self._controller = controller
+        self._user = user or 'anonymous'
+        self._owner = owner
+        self._ttl_seconds = ttl_seconds
+        self._max_wait_seconds = max_wait_seconds
+        self._poll_seconds = poll_seconds
+        self.admitted = False
+
+    def wait(self, on_queued, should_abort=lambda: False) -> bool:
+        if self._controller.try_acquire(self._user, self._owner, self._ttl_seconds):
+            self.admitted = True
+            return True
+
+        ticket = self._controller.take_ticket()
+        deadline = time.monotonic() + self._max_wait_seconds
+        last_position = None
+        try:
+            while time.monotonic() < deadline and not should_abort():
+                position = self._controller.position(ticket)
+                if position != last_position:
+                    on_queued(position)
+                    last_position = position
+                # Jitter keeps queued requests from retrying in lockstep
+                time.sleep(self._poll_seconds * random.uniform(0.5, 1.5))
+                if self._controller.try_acquire(self._user, self._owner, self._ttl_seconds):
+                    self.admitted = True
+                    return True
+            return False
+        finally:
+            self._controller.ticket_done()
+
+    def release(self):
+        if self.admitted:
+            try:
+                self._controller.release(self._user, self._owner)
+            except Exception as e:
+                logger.error(f"Error releasing admission slot for {self._owner}: {str(e)}")
+            self.admitted = False
+
+
+def create_admission_controller(user_limit: int, global_limit: int):
+    """Use the DynamoDB lease table when configured, otherwise an in-memory controller."""
+    table_name = os.environ.get("SAFETY_CHECK_LEASE_TABLE_NAME")
+    if table_name:
+        return DynamoDBAdmissionController(boto3.resource('dynamodb').Table(table_name), user_limit, global_limit)
+    logger.info("SAFETY_CHECK_LEASE_TABLE_NAME not set, using in-memory admission controller")
+    return InMemoryAdmissionController(user_limit, global_limit)
@@ -0,0 +1,135 @@
+import time
+import threading
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+
+class InMemoryCancellationRegistry:
+    """Process-local cancellation markers, used for local testing."""
+
+    def __init__(self):
+        self._cancelled = set()
+        self._following = {}
+        self._lock = threading.Lock()
+
+    def request_cancel(self, connection_id: str, request_id: str) -> bool:
+        with self._lock:
+            self._cancelled.add((connection_id, request_id))
+        return True
+
+    def is_cancelled(self, connection_id: str, request_id: str) -> bool:
+        with self._lock:
+            return (connection_id, request_id) in self._cancelled
+
+    def follow(self, connection_id: str, request_id: str, lease_key: str):
+        with self._lock:
+            self._following[(connection_id, request_id)] = lease_key
+
+    def unfollow(self, connection_id: str, request_id: str):
+        with self._lock:
+            return self._following.pop((connection_id, request_id), None)
+
+
+class DynamoDBCancellationRegistry:
+    """
+    Cancellation markers stored on the connection's row in the WebSocket
+    connection table, so they expire with the connection. The row also records
+    the lease of each request the connection follows as a single-flight
+    subscriber (follows#<request id>): a follower's cancel unsubscribes it
+    rather than stopping the leader's run.
+    """
+
+    def __init__(self, table):
+        self._table = table
+
+    def request_cancel(self, connection_id: str, request_id: str) -> bool:
+        try:
+            self._table.update_item(
+                Key={'connectionId': connection_id},
+                UpdateExpression="ADD cancelledRequests :r",
+                ConditionExpression="attribute_exists(connectionId)",
+                ExpressionAttributeValues={':r': {request_id}}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Connection {connection_id} not registered, cannot record cancellation")
+                return False
+            raise
+
+    def is_cancelled(self, connection_id: str, request_id: str) -> bool:
+        item = self._table.get_item(
+            Key={'connectionId': connection_id},
+            ProjectionExpression="cancelledRequests",
+            ConsistentRead=True
+        ).get('Item', {})
+        return request_id in item.get('cancelledRequests', set())
+
+    def follow(self, connection_id: str, request_id: str, lease_key: str):
+        """Record that the connection follows request_id's run under lease_key."""
+        try:
+            self._table.update_item(
+                Key={'connectionId': connection_id},
+                UpdateExpression="SET #f = :k",
+                ConditionExpression="attribute_exists(connectionId)",
+                ExpressionAttributeNames={'#f': f"follows#{request_id}"},
+                ExpressionAttributeValues={':k': lease_key}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.warning(f"Connection {connection_id} not registered, cannot record followed request")
+
+    def unfollow(self, connection_id: str, request_id: str):
+        """Forget a followed request, returning its lease key, or None if the connection did not follow it."""
+        attribute = f"follows#{request_id}"
+        try:
+            response = self._table.update_item(
+                Key={'connectionId': connection_id},
+                UpdateExpression="REMOVE #f",
+                ConditionExpression="attribute_exists(#f)",
+                ExpressionAttributeNames={'#f': attribute},
+                ReturnValues="UPDATED_OLD"
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            raise
+        return response.get('Attributes', {}).get(attribute)
+
+
+class CancellationToken:
+    """
+    Checked by the streaming loop between events. The registry is polled at most
+    every poll_seconds; cancel() aborts immediately, e.g. when the client's
+    connection is gone.
+    """
+
+    def __init__(self, registry, connection_id: str, request_id: str, poll_seconds: float = 2.0):
+        self._registry = registry
+        self._connection_id = connection_id
+        self._request_id = request_id
+        self._poll_seconds = poll_seconds
+        self._last_poll = 0.0
+        self.reason = None
+
+    def cancel(self, reason: str):
+        if self.reason is None:
+            logger.info(f"Cancelling request {self._request_id}: {reason}")
+            self.reason = reason
+
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is not None:
+            return True
+        now = time.monotonic()
+        if now - self._last_poll >= self._poll_seconds:
+            self._last_poll = now
+            try:
+                if self._registry.is_cancelled(self._connection_id, self._request_id):
+                    self.cancel('CLIENT_CANCELLED')
+            except Exception as e:
+                logger.error(f"Error checking cancellation for {self._request_id}: {str(e)}")
+        return self.reason is not None
@@ -0,0 +1,109 @@
+import time
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+USER_INDEX_NAME = 'UserIndex'
+
+
+class ConnectionRegistry:
+    """
+    WebSocket connection rows keyed by connectionId.
+
+    Rows expire through the table's ttl attribute and are kept alive by
+    heartbeats. The first authenticated message binds the verified user (sub and
+    email) to the row along with a digest and expiry of the token, so later
+    messages carrying the same token skip signature verification and pushes can
+    find a user's sockets through the UserIndex GSI.
+    """
+
+    def __init__(self, table, ttl_seconds: int):
+        self._table = table
+        self._ttl_seconds = ttl_seconds
+
+    def register(self, connection_id: str):
+        self._table.put_item(
+            Item={
+                'connectionId': connection_id,
+                'ttl': int(time.time()) + self._ttl_seconds,
+                'timestamp': str(datetime.now())
+            }
+        )
+
+    def remove(self, connection_id: str):
+        self._table.delete_item(Key={'connectionId': connection_id})
+
+    def touch(self, connection_id: str) -> bool:
+        """Extend the row's TTL. Returns False if the connection is no longer registered."""
+        try:
+            self._table.update_item(
+                Key={'connectionId': connection_id},
+                UpdateExpression="SET #ttl = :ttl",
+                ConditionExpression="attribute_exists(connectionId)",
+                ExpressionAttributeNames={'#ttl': 'ttl'},
+                ExpressionAttributeValues={':ttl': int(time.time()) + self._ttl_seconds}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def bind_user(self, connection_id: str, claims: dict, token_digest: str) -> bool:
+        """Record the verified user and token on the connection row."""
+        try:
+            self._table.update_item(
+                Key={'connectionId': connection_id},
+                UpdateExpression="SET userSub = :sub, email = :email, tokenDigest = :digest, tokenExp = :exp, #ttl = :ttl",
+                ConditionExpression="attribute_exists(connectionId)",
+                ExpressionAttributeNames={'#ttl': 'ttl'},
+                ExpressionAttributeValues={
+                    ':sub': claims.get('sub', 'unknown'),
+                    ':email': claims.get('email', 'unknown'),
+                    ':digest': token_digest,
+                    ':exp': int(claims.get('exp', 0)),
+                    ':ttl': int(time.time()) + self._ttl_seconds
+                }
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Connection {connection_id} not registered, cannot bind user")
+                return False
+            raise
+
+    def get_cached_claims(self, connection_id: str, token_digest: str):
+        """Return the claims bound to the connection if they were verified for this unexpired token."""
+        item = self._table.get_item(
+            Key={'connectionId': connection_id},
+            ProjectionExpression="userSub, email, tokenDigest, tokenExp",
+            ConsistentRead=True
+        ).get('Item')
+        if not item or item.get('tokenDigest') != token_digest:
+            return None
+        if int(item.get('tokenExp', 0)) <= time.time():
+            return None
+        return {'sub': item.get('userSub'), 'email': item.get('email'), 'exp': int(item['tokenExp'])}
+
+    def get_user_connections(self, user_sub: str) -> list:
+        """Connection ids currently registered to a user."""
+        connection_ids = []
+        query_kwargs = {
+            'IndexName': USER_INDEX_NAME,
+            'KeyConditionExpression': Key('userSub').eq(user_sub),
+            'ProjectionExpression': "connectionId, #ttl",
+            'ExpressionAttributeNames': {'#ttl': 'ttl'},
+        }
+        now = time.time()
+        while True:
+            response = self._table.query(**query_kwargs)
+            for item in response.get('Items', []):
+                # TTL deletion is lazy, so skip rows that have already expired
+                if int(item.get('ttl', 0)) > now:
+                    connection_ids.append(item['connectionId'])
+            if 'LastEvaluatedKey' not in response:
+                return connection_ids
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,84 @@
+import os
+import json
+import uuid
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+
+def build_job(connection_id: str, domain_name: str, stage: str, request: dict, user: str = None) -> dict:
+    """Build a safety-check job message. The auth token is never written to the queue."""
+    job_request = {k: v for k, v in request.items() if k != 'token'}
+    return {
+        'jobId': str(uuid.uuid4()),
+        'connectionId': connection_id,
+        'domainName': domain_name,
+        'stage': stage,
+        'user': user,
+        'request': job_request,
+    }
+
+
+class SQSJobQueue:
+    """Safety-check jobs queued on SQS and consumed by the worker Lambda."""
+
+    def __init__(self, queue_url: str, sqs_client=None):
+        self._queue_url = queue_url
+        self._sqs = sqs_client or boto3.client('sqs')
+
+    def enqueue(self, job: dict) -> str:
+        self._sqs.send_message(QueueUrl=self._queue_url, MessageBody=json.dumps(job, default=str))
+        return job['jobId']
+
+
+class InMemoryJobQueue:
+    """
+    Local stand-in for SQSJobQueue so job mode can be load-tested offline.
+    drain() consumes queued jobs with up to max_concurrency workers, mirroring
+    the worker Lambda's maximum concurrency.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+
+    def enqueue(self, job: dict) -> str:
+        self._jobs.put(job)
+        return job['jobId']
+
+    def __len__(self):
+        return self._jobs.qsize()
+
+    def drain(self, handler, max_concurrency: int = 5) -> list:
+        results = []
+        results_lock = threading.Lock()
+
+        def consume():
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = handler(job)
+                except Exception as e:
+                    logger.error(f"Job {job.get('jobId')} failed: {str(e)}")
+                    result = e
+                with results_lock:
+                    results.append((job['jobId'], result))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for _ in range(max_concurrency):
+                executor.submit(consume)
+        return results
+
+
+def create_job_queue():
+    """Use the SQS job queue when configured, otherwise an in-memory queue."""
+    queue_url = os.environ.get("SAFETY_CHECK_JOB_QUEUE_URL")
+    if queue_url:
+        return SQSJobQueue(queue_url)
+    return InMemoryJobQueue()
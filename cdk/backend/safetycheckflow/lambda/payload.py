@@ -0,0 +1,111 @@
+import os
+import json
+import uuid
+import hashlib
+import boto3
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+# API Gateway WebSocket frames are limited to 32KB; leave headroom for the fragment wrapper
+MAX_FRAME_BYTES = int(os.environ.get("MAX_FRAME_BYTES", "30000"))
+BRIEFING_BUCKET_NAME = os.environ.get("BRIEFING_BUCKET_NAME")
+BRIEFING_OFFLOAD_THRESHOLD_BYTES = int(os.environ.get("BRIEFING_OFFLOAD_THRESHOLD_BYTES", "100000"))
+BRIEFING_KEY_PREFIX = "briefings"
+
+_FRAGMENT_OVERHEAD_BYTES = 512
+
+s3_client = boto3.client('s3') if BRIEFING_BUCKET_NAME else None
+
+
+def _encoded_size(text: str) -> int:
+    return len(json.dumps(text).encode('utf-8'))
+
+
+def _split_text(text: str, budget: int) -> list:
+    """Split text into pieces whose JSON-encoded size fits within budget bytes."""
+    parts = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + budget)
+        size = _encoded_size(text[start:end])
+        while size > budget and end - start > 1:
+            # Shrink proportionally; escaping can inflate the encoded size
+            end = start + max(1, (end - start) * budget // size - 1)
+            size = _encoded_size(text[start:end])
+        parts.append(text[start:end])
+        start = end
+    return parts
+
+
+def encode_frames(envelope: dict, max_frame_bytes: int = MAX_FRAME_BYTES) -> list:
+    """
+    Serialize a client envelope into one or more WebSocket frames.
+
+    Envelopes larger than max_frame_bytes are sent as 'fragment' messages:
+        {'message': {'type': 'fragment', 'fragmentId', 'seq', 'total', 'data'}, ...}
+    Clients concatenate 'data' in seq order once all 'total' fragments with the
+    same fragmentId have arrived, and JSON-parse the result to recover the
+    original envelope.
+    """
+    data = json.dumps(envelope, default=str)
+    if len(data.encode('utf-8')) <= max_frame_bytes:
+        return [data]
+
+    fragment_id = str(uuid.uuid4())
+    parts = _split_text(data, max_frame_bytes - _FRAGMENT_OVERHEAD_BYTES)
+    frames = []
+    for seq, part in enumerate(parts):
+        frames.append(json.dumps({
+            'message': {
+                'type': 'fragment',
+                'fragmentId': fragment_id,
+                'seq': seq,
+                'total': len(parts),
+                'data': part,
+            },
+            'sender': envelope.get('sender'),
+            'timestamp': envelope.get('timestamp'),
+        }, default=str))
+    logger.info(f"Split {envelope.get('message', {}).get('type')} frame into {len(frames)} fragments")
+    return frames
+
+
+def store_briefing(work_order_id: str, html: str) -> dict:
+    """
+    Return the WorkOrders attributes for a briefing. Reports larger than
+    BRIEFING_OFFLOAD_THRESHOLD_BYTES are written to the data bucket under a
+    content-addressed key and only a pointer and digest are kept on the item.
+    """
+    body = html.encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()
+    if not s3_client or len(body) <= BRIEFING_OFFLOAD_THRESHOLD_BYTES:
+        return {'safetyCheckResponse': html, 'safetyCheckDigest': digest}
+
+    key = f"{BRIEFING_KEY_PREFIX}/{work_order_id}/{digest}.html"
+    s3_client.put_object(
+        Bucket=BRIEFING_BUCKET_NAME,
+        Key=key,
+        Body=body,
+        ContentType='text/html; charset=utf-8'
+    )
+    logger.info(f"Offloaded {len(body)} byte briefing for {work_order_id} to s3://{BRIEFING_BUCKET_NAME}/{key}")
+    return {
+        'safetyCheckResponseRef': {
+            'bucket': BRIEFING_BUCKET_NAME,
+            'key': key,
+            'size': len(body),
+        },
+        'safetyCheckDigest': digest,
+    }
+
+
+def load_briefing(item: dict):
+    """Return the briefing HTML for an item, following an offload pointer if present."""
+    if item.get('safetyCheckResponse'):
+        return item['safetyCheckResponse']
+    ref = item.get('safetyCheckResponseRef')
+    if not ref:
+        return None
+    response = (s3_client or boto3.client('s3')).get_object(Bucket=ref['bucket'], Key=ref['key'])
+    return response['Body'].read().decode('utf-8')
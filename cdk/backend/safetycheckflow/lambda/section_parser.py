@@ -0,0 +1,91 @@
+import re
+
+_TITLE_PATTERN = re.compile(r'<h2[^>]*>(.*?)</h2>', re.DOTALL)
+
+
+class _Marker:
+    """Incremental search for a literal token in a growing string."""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.position = None
+        self._resume_from = 0
+
+    def find(self, text: str, start: int = 0):
+        if self.position is not None:
+            return self.position
+        start = max(start, self._resume_from)
+        found = text.find(self.token, start)
+        if found == -1:
+            # Only the tail could still start a match once more text arrives
+            self._resume_from = max(start, len(text) - len(self.token) + 1)
+            return None
+        self.position = found
+        return found
+
+
+class BriefingSectionParser:
+    """
+    Incremental parser for the streamed safety briefing.
+
+    feed() accepts response chunks as they arrive and returns every <section>
+    block that closed in that chunk, so each can be sent to the client as soon as
+    it is complete. html() returns the report to persist, chosen the same way as
+    the previous regex extraction (<html> block, else <body> block, else the full
+    text) but from markers tracked during the single pass over the stream.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.sections = []
+        self._section_open = None
+        self._section_close = None
+        self._section_search_from = 0
+        self._html_open = _Marker('<html>')
+        self._html_close = _Marker('</html>')
+        self._body_open = _Marker('<body>')
+        self._body_close = _Marker('</body>')
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        self._track_document_markers()
+
+        completed = []
+        while True:
+            if self._section_open is None:
+                self._section_open = _Marker('<section')
+                self._section_close = _Marker('</section>')
+            start = self._section_open.find(self.text, self._section_search_from)
+            if start is None:
+                break
+            end = self._section_close.find(self.text, start)
+            if end is None:
+                break
+            end += len(self._section_close.token)
+            section_html = self.text[start:end]
+            title_match = _TITLE_PATTERN.search(section_html)
+            section = {
+                'index': len(self.sections),
+                'title': title_match.group(1).strip() if title_match else None,
+                'html': section_html,
+            }
+            self.sections.append(section)
+            completed.append(section)
+            self._section_search_from = end
+            self._section_open = None
+        return completed
+
+    def _track_document_markers(self):
+        html_start = self._html_open.find(self.text)
+        if html_start is not None:
+            self._html_close.find(self.text, html_start)
+        body_start = self._body_open.find(self.text)
+        if body_start is not None:
+            self._body_close.find(self.text, body_start)
+
+    def html(self) -> str:
+        if self._html_open.position is not None and self._html_close.position is not None:
+            return self.text[self._html_open.position:self._html_close.position + len('</html>')]
+        if self._body_open.position is not None and self._body_close.position is not None:
+            return self.text[self._body_open.position:self._body_close.position + len('</body>')]
+        return self.text
@@ -0,0 +1,244 @@
+import os
+import time
+import threading
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+LEASE_RUNNING = 'RUNNING'
+LEASE_COMPLETED = 'COMPLETED'
+
+
+class InMemoryLeaseStore:
+    """
+    Process-local lease store with the same interface as DynamoDBLeaseStore.
+    Used when no lease table is configured and for local testing.
+    """
+
+    def __init__(self):
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, lease_key: str, owner: str, ttl_seconds: int) -> bool:
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            if lease and lease['state'] == LEASE_RUNNING and lease['expires_at'] > now:
+                return False
+            self._leases[lease_key] = {
+                'owner': owner,
+                'state': LEASE_RUNNING,
+                'expires_at': now + ttl_seconds,
+                'subscribers': set(),
+            }
+            return True
+
+    def subscribe(self, lease_key: str, connection_id: str):
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            if not lease or lease['state'] != LEASE_RUNNING or lease['expires_at'] <= now:
+                return None
+            lease['subscribers'].add(connection_id)
+            return lease['owner']
+
+    def unsubscribe(self, lease_key: str, connection_id: str):
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            if lease:
+                lease['subscribers'].discard(connection_id)
+
+    def get_subscribers(self, lease_key: str) -> set:
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            return set(lease['subscribers']) if lease else set()
+
+    def complete(self, lease_key: str, owner: str) -> set:
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            if not lease or lease['owner'] != owner:
+                return set()
+            lease['state'] = LEASE_COMPLETED
+            return set(lease['subscribers'])
+
+    def release(self, lease_key: str, owner: str):
+        with self._lock:
+            lease = self._leases.get(lease_key)
+            if lease and lease['owner'] == owner:
+                del self._leases[lease_key]
+
+
+class DynamoDBLeaseStore:
+    """
+    Lease store backed by a DynamoDB table keyed by lease_key.
+    Items carry the owning request, a RUNNING/COMPLETED state, an expiry used by
+    the conditional writes, a ttl attribute for table cleanup and the set of
+    subscribed connection ids.
+    """
+
+    def __init__(self, table):
+        self._table = table
+
+    def acquire(self, lease_key: str, owner: str, ttl_seconds: int) -> bool:
+        now = int(time.time())
+        try:
+            self._table.put_item(
+                Item={
+                    'lease_key': lease_key,
+                    'owner': owner,
+                    'lease_state': LEASE_RUNNING,
+                    'expires_at': now + ttl_seconds,
+                    'ttl': now + ttl_seconds + 3600,
+                },
+                ConditionExpression="attribute_not_exists(lease_key) OR expires_at < :now OR lease_state = :completed",
+                ExpressionAttributeValues={
+                    ':now': now,
+                    ':completed': LEASE_COMPLETED,
+                }
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def subscribe(self, lease_key: str, connection_id: str):
+        """Join a running lease, returning the owning request id, or None if it is not running."""
+        try:
+            response = self._table.update_item(
+                Key={'lease_key': lease_key},
+                UpdateExpression="ADD subscribers :c",
+                ConditionExpression="lease_state = :running AND expires_at > :now",
+                ExpressionAttributeValues={
+                    ':c': {connection_id},
+                    ':running': LEASE_RUNNING,
+                    ':now': int(time.time()),
+                },
+                ReturnValues="ALL_NEW"
+            )
+            return response['Attributes']['owner']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            raise
+
+    def unsubscribe(self, lease_key: str, connection_id: str):
+        try:
+            self._table.update_item(
+                Key={'lease_key': lease_key},
+                UpdateExpression="DELETE subscribers :c",
+                ConditionExpression="attribute_exists(lease_key)",
+                ExpressionAttributeValues={':c': {connection_id}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def get_subscribers(self, lease_key: str) -> set:
+        item = self._table.get_item(
+            Key={'lease_key': lease_key},
+            ProjectionExpression="subscribers",
+            ConsistentRead=True
+        ).get('Item', {})
+        return set(item.get('subscribers', set()))
+
+    def complete(self, lease_key: str, owner: str) -> set:
+        """Mark the lease completed so no new followers join, returning the final subscriber set."""
+        try:
+            response = self._table.update_item(
+                Key={'lease_key': lease_key},
+                UpdateExpression="SET lease_state = :completed",
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={
+                    ':completed': LEASE_COMPLETED,
+                    ':owner': owner,
+                },
+                ReturnValues="ALL_NEW"
+            )
+            return set(response.get('Attributes', {}).get('subscribers', set()))
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Lease {lease_key} is no longer owned by {owner}")
+                return set()
+            raise
+
+    def release(self, lease_key: str, owner: str):
+        try:
+            self._table.delete_item(
+                Key={'lease_key': lease_key},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={':owner': owner}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+
+class SubscriberSet:
+    """
+    Recipients of a leader's frames: the leader connection plus followers
+    subscribed to the lease, re-read from the store at most every refresh_seconds.
+    A leader that cancels or disconnects is detached while the run continues
+    for its followers.
+    """
+
+    def __init__(self, lease_store, lease_key: str, leader_connection_id: str, refresh_seconds: float = 2.0):
+        self._lease_store = lease_store
+        self._lease_key = lease_key
+        self._leader = leader_connection_id
+        self._refresh_seconds = refresh_seconds
+        self._subscribers = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> list:
+        with self._lock:
+            now = time.monotonic()
+            if self._lease_key and now - self._refreshed_at >= self._refresh_seconds:
+                try:
+                    self._subscribers = self._lease_store.get_subscribers(self._lease_key)
+                except Exception as e:
+                    logger.error(f"Error reading subscribers for {self._lease_key}: {str(e)}")
+                self._refreshed_at = now
+            return self._with_leader()
+
+    def _with_leader(self) -> list:
+        leader = [self._leader] if self._leader else []
+        return leader + sorted(self._subscribers - set(leader))
+
+    def followers(self, refresh: bool = False) -> list:
+        """Subscribed followers, re-read from the store first when refresh is set."""
+        if refresh:
+            with self._lock:
+                self._refreshed_at = 0.0
+        leader = self._leader
+        return [recipient for recipient in self.current() if recipient != leader]
+
+    def detach_leader(self):
+        """Stop sending frames to the leader connection."""
+        with self._lock:
+            self._leader = None
+
+    @property
+    def leader_detached(self) -> bool:
+        return self._leader is None
+
+    def finalize(self, subscribers: set) -> list:
+        """Replace the subscriber set with the final one returned when completing the lease."""
+        with self._lock:
+            self._subscribers = set(subscribers)
+            self._refreshed_at = time.monotonic()
+            return self._with_leader()
+
+
+def create_lease_store():
+    """Use the DynamoDB lease table when configured, otherwise an in-memory store."""
+    table_name = os.environ.get("SAFETY_CHECK_LEASE_TABLE_NAME")
+    if table_name:
+        return DynamoDBLeaseStore(boto3.resource('dynamodb').Table(table_name))
+    logger.info("SAFETY_CHECK_LEASE_TABLE_NAME not set, using in-memory lease store")
+    return InMemoryLeaseStore()
@@ -0,0 +1,91 @@
+"""
+Projection of raw Bedrock agent trace events onto the compact schema sent to
+WebSocket clients.
+
+Levels:
+    none      - no trace frames are sent
+    rationale - only events carrying orchestration rationale text
+    steps     - every event reduced to step type, rationale, collaborator and timing
+    full      - the raw trace event, unchanged
+"""
+
+TRACE_LEVELS = ('none', 'rationale', 'steps', 'full')
+DEFAULT_TRACE_LEVEL = 'rationale'
+
+_TOP_LEVEL_STEPS = {
+    'preProcessingTrace': 'pre_processing',
+    'postProcessingTrace': 'post_processing',
+    'routingClassifierTrace': 'routing',
+    'guardrailTrace': 'guardrail',
+    'customOrchestrationTrace': 'custom_orchestration',
+    'failureTrace': 'failure',
+}
+
+
+def normalize_trace_level(level) -> str:
+    """Return a supported trace level, falling back to the default."""
+    if isinstance(level, str) and level.lower() in TRACE_LEVELS:
+        return level.lower()
+    return DEFAULT_TRACE_LEVEL
+
+
+def _describe_step(inner: dict):
+    """Return (step type, detail, collaborator name) for the inner trace object."""
+    orchestration = inner.get('orchestrationTrace')
+    if orchestration:
+        if 'rationale' in orchestration:
+            return 'rationale', None, None
+        if 'invocationInput' in orchestration:
+            invocation = orchestration['invocationInput']
+            invocation_type = (invocation.get('invocationType') or 'invocation').lower()
+            collaborator = invocation.get('agentCollaboratorInvocationInput', {}).get('agentCollaboratorName')
+            action_group = invocation.get('actionGroupInvocationInput', {})
+            detail = action_group.get('function') or action_group.get('actionGroupName')
+            return f"invoke_{invocation_type}", detail, collaborator
+        if 'observation' in orchestration:
+            observation = orchestration['observation']
+            observation_type = (observation.get('type') or 'observation').lower()
+            collaborator = observation.get('agentCollaboratorInvocationOutput', {}).get('agentCollaboratorName')
+            return f"observation_{observation_type}", None, collaborator
+        if 'modelInvocationInput' in orchestration:
+            return 'model_input', None, None
+        if 'modelInvocationOutput' in orchestration:
+            return 'model_output', None, None
+        return 'orchestration', None, None
+
+    for key, step in _TOP_LEVEL_STEPS.items():
+        if key in inner:
+            detail = inner[key].get('failureReason') if key == 'failureTrace' else None
+            return step, detail, None
+    return 'unknown', None, None
+
+
+def project_trace(event_trace: dict, level: str, elapsed_ms: int):
+    """
+    Map a raw trace event from invoke_agent onto the compact client schema.
+    Returns None when the event should not be sent at the given level.
+    """
+    if level == 'none' or not event_trace:
+        return None
+    if level == 'full':
+        return event_trace
+
+    inner = event_trace.get('trace', {}) or {}
+    rationale = inner.get('orchestrationTrace', {}).get('rationale', {}).get('text')
+    step, detail, collaborator = _describe_step(inner)
+    collaborator = event_trace.get('collaboratorName') or collaborator
+
+    if level == 'rationale':
+        if not rationale:
+            return None
+        projected = {'rationale': rationale, 'elapsedMs': elapsed_ms}
+    else:
+        projected = {'step': step, 'elapsedMs': elapsed_ms}
+        if rationale:
+            projected['rationale'] = rationale
+        if detail:
+            projected['detail'] = detail
+
+    if collaborator:
+        projected['collaborator'] = collaborator
+    return projected
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+_STOP = object()
+
+
+class TraceSender:
+    """
+    Background sender that takes trace events off the agent completion loop.
+    Events are placed on a bounded queue and coalesced into a single 'trace' frame
+    every flush_interval_ms or max_batch_size events, whichever comes first.
+    When the queue is full new events are dropped and counted rather than
+    blocking the Bedrock event stream.
+    Other frames (e.g. response chunks) are never dropped and are delivered in
+    order after any traces queued before them.
+    """
+
+    def __init__(self, send, flush_interval_ms=250, max_batch_size=20, max_queue_size=500):
+        self._send = send
+        self._flush_interval = flush_interval_ms / 1000.0
+        self._max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.received = 0
+        self.frames_sent = 0
+        self.other_frames_sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-sender", daemon=True)
+        self._thread.start()
+
+    def send_trace(self, trace) -> bool:
+        """Queue a trace event without blocking. Returns False if it was dropped."""
+        with self._lock:
+            self.received += 1
+        try:
+            self._queue.put_nowait((True, trace))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def send_frame(self, frame, timeout=10.0) -> bool:
+        """Queue a frame for ordered delivery, waiting for space if the queue is full."""
+        try:
+            self._queue.put((False, frame), timeout=timeout)
+            return True
+        except queue.Full:
+            logger.error(f"Timed out queueing {frame.get('type')} frame")
+            return False
+
+    def close(self, timeout=10.0):
+        """Flush any pending traces and stop the sender thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Trace queue still full on close, abandoning pending traces")
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Trace sender did not finish flushing before timeout")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'received': self.received,
+                'framesSent': self.frames_sent,
+                'otherFramesSent': self.other_frames_sent,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+            }
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush(batch)
+                batch = []
+                continue
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+
+            is_trace, payload = item
+            if not is_trace:
+                # Keep ordering: traces queued before this frame go out first
+                self._flush(batch)
+                batch = []
+                self._deliver(payload)
+                continue
+
+            if not batch:
+                deadline = time.monotonic() + self._flush_interval
+            batch.append(payload)
+            if len(batch) >= self._max_batch_size:
+                self._flush(batch)
+                batch = []
+
+    def _deliver(self, frame):
+        try:
+            self._send(frame)
+        except Exception as e:
+            logger.error(f"Error sending {frame.get('type')} frame: {str(e)}")
+        with self._lock:
+            self.other_frames_sent += 1
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self._send({
+                'type': 'trace',
+                'traces': batch
+            })
+        except Exception as e:
+            logger.error(f"Error sending trace batch: {str(e)}")
+        with self._lock:
+            self.frames_sent += 1
+            self.coalesced += len(batch) - 1
@@ -6,13 +6,24 @@ import requests
 from datetime import datetime
 import functools
 import traceback
-import re
+import hashlib
 from collections import OrderedDict
 from boto3.dynamodb.conditions import Key
 from jose import jwt
 from botocore.config import Config
 from aws_lambda_powertools import Logger
 import uuid
+import threading
+from trace_sender import TraceSender
+from trace_projection import normalize_trace_level, project_trace
+from single_flight import SubscriberSet, create_lease_store
+from job_queue import InMemoryJobQueue, build_job, create_job_queue
+from payload import encode_frames, load_briefing, store_briefing
+from section_parser import BriefingSectionParser
+from cancellation import CancellationToken, DynamoDBCancellationRegistry
+from admission import Admission, create_admission_controller
+from connections import ConnectionRegistry
+from briefing_history import BriefingHistory
 
 # Initialize services and constants
 logger = Logger()
@@ -20,6 +31,9 @@ def log(message):
     logger.info(message)
 dynamodb = boto3.resource('dynamodb')
 ws_connection_table = dynamodb.Table(os.environ['WS_CONNECTION_TABLE_NAME'])
+# Connection rows expire this long after connect or the last heartbeat
+CONNECTION_TTL_SECONDS = int(os.environ.get("CONNECTION_TTL_SECONDS", "600"))
+connection_registry = ConnectionRegistry(ws_connection_table, CONNECTION_TTL_SECONDS)
 
 # Environment variables
 REGION = os.environ.get("REGION", "us-east-1")
@@ -29,72 +43,141 @@ AGENT_ALIAS_ID = os.getenv("AGENT_ALIAS_ID")
 AGENT_ID = os.getenv("AGENT_ID")
 WORK_ORDERS_TABLE_NAME = os.environ.get("WORK_ORDERS_TABLE_NAME")
 work_orders_table = dynamodb.Table(WORK_ORDERS_TABLE_NAME) if WORK_ORDERS_TABLE_NAME else None
+# Briefing HTML lives in its own table keyed by work_order_id; without one it stays on the WorkOrders item
+BRIEFINGS_TABLE_NAME = os.environ.get("BRIEFINGS_TABLE_NAME")
+briefings_table = dynamodb.Table(BRIEFINGS_TABLE_NAME) if BRIEFINGS_TABLE_NAME else work_orders_table
+# Work order writes stamp updated_at (epoch ms) and the sparse SyncIndex partition
+SYNC_PARTITION = "work_orders"
+SYNC_STAMP_EXPRESSION = ", updated_at = :u, sync_partition = :sp"
+# Every distinct briefing is also appended, compressed, to the history table
+BRIEFING_HISTORY_TABLE_NAME = os.environ.get("BRIEFING_HISTORY_TABLE_NAME")
+briefing_history = BriefingHistory(dynamodb.Table(BRIEFING_HISTORY_TABLE_NAME)) if BRIEFING_HISTORY_TABLE_NAME else None
 
-# Function to extract HTML content from a response
-def extract_html_content(text):
-    """
-    Extract HTML content from a text string if it exists.
-    Returns the HTML content if found, otherwise returns the original text.
-    """
-    try:
-        # Look for HTML content between <html> tags
-        html_pattern = re.compile(r'<html>.*?</html>', re.DOTALL)
-        html_match = html_pattern.search(text)
-        
-        if html_match:
-            return html_match.group(0)
-        
-        # If no <html> tags, look for content between <body> tags
-        body_pattern = re.compile(r'<body>.*?</body>', re.DOTALL)
-        body_match = body_pattern.search(text)
-        
-        if body_match:
-            return body_match.group(0)
-        
-        # If no <body> tags, look for any HTML-like content with multiple tags
-        if '<div' in text and '</div>' in text:
-            # This is a simple heuristic - if there are div tags, it's likely HTML content
-            return text
-            
-        # Return original text if no HTML patterns found
-        return text
-    except Exception as e:
-        logger.error(f"Error extracting HTML content: {str(e)}")
-        return text  # Return original text on error
+# JWKS and verified token caching (kept across warm invocations)
+JWKS_URL = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}/.well-known/jwks.json"
+JWKS_CACHE_TTL_SECONDS = int(os.environ.get("JWKS_CACHE_TTL_SECONDS", "3600"))
+JWKS_REFRESH_MIN_INTERVAL_SECONDS = int(os.environ.get("JWKS_REFRESH_MIN_INTERVAL_SECONDS", "60"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.environ.get("VERIFIED_TOKEN_CACHE_SIZE", "256"))
+
+_jwks_keys = {}  # kid -> JWK
+_jwks_fetched_at = 0.0
+_jwks_last_refresh_attempt = 0.0
+_verified_tokens = OrderedDict()  # sha256(token) -> (exp, decoded claims)
+_bound_connections = OrderedDict()  # connectionId -> sha256(token) already recorded on its row
+
+# API Gateway Management API clients, keyed by "domainName/stage"
+APIGW_MAX_POOL_CONNECTIONS = int(os.environ.get("APIGW_MAX_POOL_CONNECTIONS", "25"))
+_api_gateway_clients = {}
+_api_gateway_clients_lock = threading.Lock()
+
+# Trace batching for the background sender
+TRACE_FLUSH_INTERVAL_MS = int(os.environ.get("TRACE_FLUSH_INTERVAL_MS", "250"))
+TRACE_MAX_BATCH_SIZE = int(os.environ.get("TRACE_MAX_BATCH_SIZE", "20"))
+TRACE_MAX_QUEUE_SIZE = int(os.environ.get("TRACE_MAX_QUEUE_SIZE", "500"))
+
+# Incremental streaming of the final response
+STREAM_FINAL_RESPONSE = os.environ.get("STREAM_FINAL_RESPONSE", "true").lower() == "true"
+STREAM_MIN_FLUSH_CHARS = int(os.environ.get("STREAM_MIN_FLUSH_CHARS", "200"))
+
+# Stored briefings are replayed for identical work order input within this window
+BRIEFING_CACHE_TTL_SECONDS = int(os.environ.get("BRIEFING_CACHE_TTL_SECONDS", "900"))
+
+# Single-flight leases for concurrent checks of the same work order input
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.environ.get("SINGLE_FLIGHT_LEASE_SECONDS", "200"))
+SINGLE_FLIGHT_SUBSCRIBER_REFRESH_SECONDS = float(os.environ.get("SINGLE_FLIGHT_SUBSCRIBER_REFRESH_SECONDS", "2"))
+# Followers subscribe part way through a run, so partial briefing frames only go
+# to the leader; followers receive the whole briefing in the final frame
+LEADER_ONLY_FRAMES = ('chunk', 'section')
+lease_store = create_lease_store()
+
+# Cancellation markers are polled between agent events at most this often
+CANCEL_POLL_SECONDS = float(os.environ.get("CANCEL_POLL_SECONDS", "2"))
+cancellation_registry = DynamoDBCancellationRegistry(ws_connection_table)
+
+# Concurrent agent runs allowed per user and across all users; requests over the
+# limit wait in line for up to ADMISSION_MAX_WAIT_SECONDS before being rejected
+ADMISSION_USER_LIMIT = int(os.environ.get("ADMISSION_USER_LIMIT", "2"))
+ADMISSION_GLOBAL_LIMIT = int(os.environ.get("ADMISSION_GLOBAL_LIMIT", "20"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "60"))
+ADMISSION_POLL_SECONDS = float(os.environ.get("ADMISSION_POLL_SECONDS", "2"))
+admission_controller = create_admission_controller(ADMISSION_USER_LIMIT, ADMISSION_GLOBAL_LIMIT)
+
+# Optional job mode: $default validates and enqueues, the worker Lambda runs the check
+SAFETY_CHECK_JOB_MODE = os.environ.get("SAFETY_CHECK_JOB_MODE", "false").lower() == "true"
+job_queue = create_job_queue() if SAFETY_CHECK_JOB_MODE else None
 
 bedrock_agent_runtime_client = boto3.client(
     'bedrock-agent-runtime',
     config=Config(
+        # Adaptive mode rate-limits client-side once Bedrock starts throttling
+        # instead of amplifying the load with immediate retries
         retries={
             'max_attempts': 5, 
-            'mode': 'standard' 
+            'mode': 'adaptive' 
         },
         read_timeout=80,       
         connect_timeout=10,    
         region_name= REGION 
     )
 )
+def refresh_jwks():
+    """Fetch the user pool JWKS and replace the cached key set."""
+    global _jwks_keys, _jwks_fetched_at, _jwks_last_refresh_attempt
+    _jwks_last_refresh_attempt = time.time()
+    # Add timeout parameter to prevent hanging connections
+    response = requests.get(JWKS_URL, timeout=15)
+    response.raise_for_status()  # Raise exception for non-200 responses
+
+    keys = response.json().get("keys", [])
+    if not keys:
+        raise ValueError("No keys found in JWKS response")
+
+    _jwks_keys = {k["kid"]: k for k in keys if k.get("kid")}
+    _jwks_fetched_at = time.time()
+    logger.info(f"Refreshed JWKS, {len(_jwks_keys)} keys cached")
+
+def get_signing_key(kid: str) -> dict:
+    """
+    Return the JWK for a key id from the warm-container cache.
+    The key set is refetched when its TTL has expired, or when an unknown kid is
+    seen and the last refresh attempt is older than the minimum refresh interval.
+    """
+    now = time.time()
+    if not _jwks_keys or now - _jwks_fetched_at > JWKS_CACHE_TTL_SECONDS:
+        try:
+            refresh_jwks()
+        except Exception as e:
+            if not _jwks_keys:
+                raise
+            # Keep serving the stale key set rather than failing every request
+            logger.warning(f"JWKS refresh failed, using cached keys: {str(e)}")
+    elif kid not in _jwks_keys and now - _jwks_last_refresh_attempt >= JWKS_REFRESH_MIN_INTERVAL_SECONDS:
+        logger.info(f"Unknown kid {kid}, refreshing JWKS")
+        refresh_jwks()
+
+    key = _jwks_keys.get(kid)
+    if not key:
+        raise ValueError(f"No matching key found for kid: {kid}")
+    return key
+
 def verify_token(token: str) -> dict:
     try:
-        url = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}/.well-known/jwks.json"
-        # Add timeout parameter to prevent hanging connections
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()  # Raise exception for non-200 responses
-        
-        keys = response.json().get("keys", [])
-        if not keys:
-            raise ValueError("No keys found in JWKS response")
-            
+        # Tokens already verified on this container are served from cache until they expire
+        token_digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        cached = _verified_tokens.get(token_digest)
+        if cached:
+            exp, decoded = cached
+            if exp > time.time():
+                _verified_tokens.move_to_end(token_digest)
+                return decoded
+            del _verified_tokens[token_digest]
+
         header = jwt.get_unverified_header(token)
         if not header or "kid" not in header:
             raise ValueError("Invalid token header")
-            
-        matching_keys = [k for k in keys if k.get("kid") == header.get("kid")]
-        if not matching_keys:
-            raise ValueError(f"No matching key found for kid: {header.get('kid')}")
-            
-        key = matching_keys[0]
-        
+
+        key = get_signing_key(header.get("kid"))
+
         decoded = jwt.decode(
             token,
             key,
@@ -102,6 +185,12 @@ def verify_token(token: str) -> dict:
             options={"verify_at_hash": False},
             audience=CLIENT_ID,
         )
+
+        exp = decoded.get("exp")
+        if exp:
+            _verified_tokens[token_digest] = (float(exp), decoded)
+            while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
         return decoded
     except requests.RequestException as e:
         logger.error(f"Error fetching JWKS: {str(e)}")
@@ -110,16 +199,108 @@ def verify_token(token: str) -> dict:
         logger.error(f"Token verification error: {str(e)}")
         raise
 
+def authenticate(connection_id: str, token: str) -> dict:
+    """
+    Return the claims for a message's token. Tokens already verified for this
+    connection are read back from its registry row instead of being re-verified,
+    and the first verified token on a connection is bound to the row.
+    """
+    token_digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = _verified_tokens.get(token_digest)
+    if not cached or cached[0] <= time.time():
+        try:
+            claims = connection_registry.get_cached_claims(connection_id, token_digest)
+        except Exception as e:
+            logger.error(f"Error reading cached claims for {connection_id}: {str(e)}")
+            claims = None
+        if claims:
+            _remember_binding(connection_id, token_digest)
+            return claims
+
+    decoded = verify_token(token)
+    if _bound_connections.get(connection_id) != token_digest:
+        try:
+            if connection_registry.bind_user(connection_id, decoded, token_digest):
+                _remember_binding(connection_id, token_digest)
+        except Exception as e:
+            logger.error(f"Error binding user to connection {connection_id}: {str(e)}")
+    return decoded
+
+def _remember_binding(connection_id: str, token_digest: str):
+    _bound_connections[connection_id] = token_digest
+    _bound_connections.move_to_end(connection_id)
+    while len(_bound_connections) > VERIFIED_TOKEN_CACHE_SIZE:
+        _bound_connections.popitem(last=False)
+
+def compute_input_digest(work_order_details) -> str:
+    """Canonical SHA-256 of the work order payload, independent of key order and whitespace."""
+    canonical = json.dumps(work_order_details, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def get_cached_briefing(work_order_id: str, input_digest: str):
+    """
+    Return the stored briefing for a work order if it was generated from the same
+    input digest within BRIEFING_CACHE_TTL_SECONDS, otherwise None.
+    """
+    if not briefings_table or BRIEFING_CACHE_TTL_SECONDS <= 0:
+        return None
+    try:
+        item = briefings_table.get_item(
+            Key={'work_order_id': work_order_id},
+            ProjectionExpression="safetyCheckResponse, safetyCheckResponseRef, safetyCheckPerformedAt, safetyCheckInputDigest"
+        ).get('Item')
+        if not item or item.get('safetyCheckInputDigest') != input_digest:
+            return None
+        performed_at = datetime.fromisoformat(item['safetyCheckPerformedAt'])
+        if (datetime.now() - performed_at).total_seconds() > BRIEFING_CACHE_TTL_SECONDS:
+            return None
+        briefing = load_briefing(item)
+        if not briefing:
+            return None
+        return {
+            'safetyCheckResponse': briefing,
+            'safetyCheckPerformedAt': item['safetyCheckPerformedAt']
+        }
+    except Exception as e:
+        # A cache lookup failure should never block a fresh safety check
+        logger.error(f"Error reading cached briefing for {work_order_id}: {str(e)}")
+        return None
+
+def get_api_gateway_management_client(domain_name: str, stage: str):
+    """
+    Return a pooled API Gateway Management API client for the WebSocket endpoint.
+    Clients are reused across warm invocations so endpoint resolution and TLS
+    connections are paid once per container rather than once per message.
+    """
+    endpoint_key = f"{domain_name}/{stage}"
+    client = _api_gateway_clients.get(endpoint_key)
+    if client is None:
+        with _api_gateway_clients_lock:
+            client = _api_gateway_clients.get(endpoint_key)
+            if client is None:
+                logger.info(f"Creating API Gateway Management client for {endpoint_key}")
+                client = boto3.client(
+                    'apigatewaymanagementapi',
+                    endpoint_url=f'https://{endpoint_key}',
+                    config=Config(
+                        region_name=REGION,
+                        max_pool_connections=APIGW_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        retries={
+                            'max_attempts': 3,
+                            'mode': 'standard'
+                        },
+                        connect_timeout=5,
+                        read_timeout=10,
+                    )
+                )
+                _api_gateway_clients[endpoint_key] = client
+    return client
+
 def handle_connect(connection_id):
     try:
         logger.info(f"Adding new connection entry to DynamoDB for {connection_id}")
-        ws_connection_table.put_item(
-            Item={
-                'connectionId': connection_id,
-                'ttl': int(time.time()) + 10 * 60,  # 10 minute TTL (comment says 24 hour but code was 10 min)
-                'timestamp': str(datetime.now())
-            }
-        )
+        connection_registry.register(connection_id)
         return {'statusCode': 200, 'body': 'Connected'}
     except Exception as e:
         logger.error(f"Connection handling error: {str(e)}")
@@ -129,14 +310,18 @@ def handle_connect(connection_id):
 def handle_disconnect(connection_id):
     try:
         logger.info(f"Removing connection {connection_id} from DynamoDB")
-        ws_connection_table.delete_item(Key={'connectionId': connection_id})
+        connection_registry.remove(connection_id)
+        _bound_connections.pop(connection_id, None)
         return {'statusCode': 200, 'body': 'Disconnected'}
     except Exception as e:
         logger.error(f"Disconnect handling error: {str(e)}")
         logger.error(traceback.format_exc())
         return {'statusCode': 200, 'body': 'Disconnected'}
 
-def handle_message(api_gateway_management, connection_id, event):
+def handle_message(api_gateway_management, connection_id, event, request_id=None, user=None):
+    lease_key = None
+    recipients = None
+    admission = None
     try:
         # Parse request body
         event_body = json.loads(event["body"])
@@ -144,8 +329,8 @@ def handle_message(api_gateway_management, connection_id, event):
         session_id = event_body.get('session_id', str(uuid.uuid4()))
         
 
-        # Generate unique request ID
-        request_id = str(uuid.uuid4())
+        # Generate unique request ID (queued jobs reuse their job id)
+        request_id = request_id or str(uuid.uuid4())
         
         payload = json.dumps(event_body)
 
@@ -157,40 +342,226 @@ def handle_message(api_gateway_management, connection_id, event):
             logger.error(f"Error in getting work order: {str(ex)}")
 
         logger.info(f"Performing safety checks for: {payload}")
-        
 
-    
+        # Replay a fresh briefing for identical input instead of re-running the agents
+        work_order_details = event_body.get('workOrderDetails')
+        input_digest = None
+        if isinstance(work_order_details, dict) and work_order_details.get('work_order_id'):
+            input_digest = compute_input_digest(work_order_details)
+            if not event_body.get('force_refresh'):
+                cached = get_cached_briefing(work_order_details['work_order_id'], input_digest)
+                if cached:
+                    logger.info(f"Serving cached briefing for work_order_id: {work_order_details['work_order_id']}")
+                    send_to_client(api_gateway_management, connection_id, {
+                        'type': 'final',
+                        'requestId': request_id,
+                        'status': 'COMPLETED',
+                        'cached': True,
+                        'safetyCheckResponse': cached['safetyCheckResponse'],
+                        'safetyCheckPerformedAt': cached['safetyCheckPerformedAt']
+                    })
+                    return {'statusCode': 200, 'body': 'Message sent'}
+
+        # Collapse concurrent checks of the same work order input into one agent run:
+        # the first request leads, later ones subscribe to the leader's frames
+        if input_digest:
+            candidate_key = f"{work_order_details['work_order_id']}#{input_digest}"
+            try:
+                leader_request_id = None
+                if lease_store.acquire(candidate_key, request_id, SINGLE_FLIGHT_LEASE_SECONDS):
+                    lease_key = candidate_key
+                else:
+                    leader_request_id = lease_store.subscribe(candidate_key, connection_id)
+                if leader_request_id:
+                    logger.info(f"Subscribed {connection_id} to in-flight safety check {candidate_key}")
+                    # The leader's frames carry its request id, which is also what
+                    # this connection cancels with; see handle_cancel
+                    try:
+                        cancellation_registry.follow(connection_id, leader_request_id, candidate_key)
+                    except Exception as follow_error:
+                        logger.error(f"Error recording followed request {leader_request_id}: {str(follow_error)}")
+                    send_to_client(api_gateway_management, connection_id, {
+                        'type': 'status',
+                        'requestId': leader_request_id,
+                        'status': 'SUBSCRIBED'
+                    })
+                    return {'statusCode': 200, 'body': 'Subscribed to in-flight safety check'}
+                elif not lease_key:
+                    logger.info(f"In-flight check {candidate_key} finished before subscribing, running independently")
+            except Exception as lease_error:
+                logger.error(f"Single-flight lease error, running independently: {str(lease_error)}")
+
+        recipients = SubscriberSet(lease_store, lease_key, connection_id, SINGLE_FLIGHT_SUBSCRIBER_REFRESH_SECONDS)
+        cancel_token = CancellationToken(cancellation_registry, connection_id, request_id, CANCEL_POLL_SECONDS)
+        gone_connections = set()
+
+        def broadcast(frame):
+            current = recipients.current()
+            if frame.get('type') in LEADER_ONLY_FRAMES:
+                current = [recipient for recipient in current if recipient == connection_id]
+                if not current:
+                    return
+            for recipient in current:
+                if recipient in gone_connections:
+                    continue
+                if not send_to_client(api_gateway_management, recipient, frame):
+                    gone_connections.add(recipient)
+            # Nobody is left to receive the briefing
+            if gone_connections.issuperset(current):
+                cancel_token.cancel('CONNECTION_GONE')
+
+        def should_stop():
+            """
+            True once nobody is left to receive the run. A leader that cancels or
+            disconnects while followers are subscribed is detached instead, and
+            the run continues, and is persisted, for the followers.
+            """
+            if not cancel_token.cancelled:
+                return False
+            live_followers = [
+                follower for follower in recipients.followers(refresh=not recipients.leader_detached)
+                if follower not in gone_connections
+            ]
+            if not live_followers:
+                return True
+            if not recipients.leader_detached:
+                logger.info(f"Leader of safety check {request_id} left ({cancel_token.reason}), continuing for {len(live_followers)} followers")
+                recipients.detach_leader()
+                if connection_id not in gone_connections:
+                    send_to_client(api_gateway_management, connection_id, {
+                        'type': 'cancelled',
+                        'requestId': request_id,
+                        'status': 'CANCELLED',
+                        'reason': cancel_token.reason
+                    })
+            return False
+
+        send_to_client(api_gateway_management, connection_id, {
+            'type': 'status',
+            'requestId': request_id,
+            'status': 'STARTED'
+        })
+
+        # Client-selected trace detail: none, rationale, steps or full
+        trace_level = normalize_trace_level(event_body.get('traceLevel'))
+        stream_response = STREAM_FINAL_RESPONSE and event_body.get('stream', True) is not False
+
         # Prepare input parameters for Bedrock agent
         input_params = {
             "inputText": payload,
             "agentId": AGENT_ID,
             "agentAliasId": AGENT_ALIAS_ID,
             "sessionId": session_id,
-            "enableTrace": True
+            "enableTrace": trace_level != 'none'
         }
+        if stream_response:
+            input_params["streamingConfigurations"] = {"streamFinalResponse": True}
+
+        # Wait for a per-user and global run slot, telling the client where it is in line
+        admission = Admission(
+            admission_controller, user, request_id, SINGLE_FLIGHT_LEASE_SECONDS,
+            ADMISSION_MAX_WAIT_SECONDS, ADMISSION_POLL_SECONDS
+        )
+        admitted = admission.wait(
+            lambda position: broadcast({
+                'type': 'queued',
+                'requestId': request_id,
+                'status': 'QUEUED',
+                'position': position
+            }),
+            should_abort=should_stop
+        )
+        if should_stop():
+            admission.release()
+            return finish_cancelled(api_gateway_management, recipients, gone_connections, lease_key, request_id, cancel_token.reason)
+        if not admitted:
+            logger.warning(f"Safety check {request_id} not admitted within {ADMISSION_MAX_WAIT_SECONDS}s")
+            broadcast({
+                'type': 'error',
+                'requestId': request_id,
+                'status': 'THROTTLED',
+                'safetyCheckResponse': "Too many safety checks are running, please try again shortly"
+            })
+            release_lease(lease_key, request_id)
+            return {'statusCode': 429, 'body': 'Safety check not admitted'}
 
-        
         # Invoke the agent API
+        invoke_started = time.monotonic()
         response = bedrock_agent_runtime_client.invoke_agent(**input_params)
 
-        completion = ""
-        
-        # Process the response chunks
-        for event_item in response['completion']:
-            if 'chunk' in event_item:
-                chunk = event_item['chunk']
-                if 'bytes' in chunk:
-                    chunk_data = chunk['bytes'].decode('utf-8')
-                    completion += chunk_data
-            
-            if 'trace' in event_item:
-                trace = event_item['trace']
-                timestamp = int(time.time() * 1000)
-                # Send only orchestration trace, then send to client.
-                send_to_client(api_gateway_management, connection_id, {
-                    'type': 'trace',
-                    'content': trace
+        # Traces are pushed from a background thread so API Gateway round trips
+        # don't stall consumption of the Bedrock event stream
+        trace_sender = TraceSender(
+            broadcast,
+            flush_interval_ms=TRACE_FLUSH_INTERVAL_MS,
+            max_batch_size=TRACE_MAX_BATCH_SIZE,
+            max_queue_size=TRACE_MAX_QUEUE_SIZE,
+        )
+        # Text received but not yet forwarded, and the sequence number of the next chunk frame
+        pending_text = ""
+        chunk_seq = 0
+        # Emits each <section> of the report as it closes and extracts the HTML to persist
+        section_parser = BriefingSectionParser()
+        try:
+            # Process the response chunks
+            for event_item in response['completion']:
+                if should_stop():
+                    break
+                if 'chunk' in event_item:
+                    chunk = event_item['chunk']
+                    if 'bytes' in chunk:
+                        chunk_data = chunk['bytes'].decode('utf-8')
+                        completed_sections = section_parser.feed(chunk_data)
+                        if stream_response:
+                            pending_text += chunk_data
+                            if len(pending_text) >= STREAM_MIN_FLUSH_CHARS:
+                                trace_sender.send_frame({
+                                    'type': 'chunk',
+                                    'seq': chunk_seq,
+                                    'content': pending_text
+                                })
+                                chunk_seq += 1
+                                pending_text = ""
+                            for section in completed_sections:
+                                trace_sender.send_frame({
+                                    'type': 'section',
+                                    'seq': section['index'],
+                                    'title': section['title'],
+                                    'html': section['html']
+                                })
+
+                if 'trace' in event_item:
+                    elapsed_ms = int((time.monotonic() - invoke_started) * 1000)
+                    projected = project_trace(event_item['trace'], trace_level, elapsed_ms)
+                    if projected is not None:
+                        trace_sender.send_trace(projected)
+
+            if pending_text:
+                trace_sender.send_frame({
+                    'type': 'chunk',
+                    'seq': chunk_seq,
+                    'content': pending_text
                 })
+                chunk_seq += 1
+        finally:
+            # Flush pending traces before the final frame is sent
+            trace_sender.close()
+            # The agent run is over, give its slot to the next queued request
+            admission.release()
+        # HTML extracted while the response streamed in. It is what gets persisted,
+        # so the final frame matches what a cache hit replays
+        processed_response = section_parser.html()
+
+        if should_stop():
+            # Stop consuming the agent stream and skip persisting a partial briefing
+            try:
+                response['completion'].close()
+            except Exception as e:
+                logger.warning(f"Error closing agent event stream: {str(e)}")
+            return finish_cancelled(api_gateway_management, recipients, gone_connections, lease_key, request_id, cancel_token.reason)
+
+        trace_stats = trace_sender.stats()
+        logger.info(f"Trace delivery stats: {trace_stats}")
 
         # Get current timestamp in ISO format
         current_time = datetime.now().isoformat()
@@ -199,22 +570,57 @@ def handle_message(api_gateway_management, connection_id, event):
             if work_orders_table and 'workOrderDetails' in event_body:
                 work_order_id = event_body['workOrderDetails'].get('work_order_id')
                 if work_order_id:
-                    
-                    
-                    # Extract HTML content if it exists
-                    processed_response = extract_html_content(completion)
-                    
+
                     logger.info(f"Updating WorkOrders table for work_order_id: {work_order_id}")
-                    # Update the WorkOrders table with the safety check response and timestamp
-                    work_orders_table.update_item(
+                    # Large reports are offloaded to S3 with only a pointer kept on the item
+                    briefing_attributes = store_briefing(work_order_id, processed_response)
+                    if 'safetyCheckResponseRef' in briefing_attributes:
+                        update_expression = "set safetyCheckResponseRef = :r, safetyCheckDigest = :g, safetyCheckPerformedAt = :p, safetyCheckInputDigest = :d"
+                        remove_expression = " remove safetyCheckResponse"
+                        response_value = briefing_attributes['safetyCheckResponseRef']
+                    else:
+                        update_expression = "set safetyCheckResponse = :r, safetyCheckDigest = :g, safetyCheckPerformedAt = :p, safetyCheckInputDigest = :d"
+                        remove_expression = " remove safetyCheckResponseRef"
+                        response_value = briefing_attributes['safetyCheckResponse']
+                    expression_values = {
+                        ':r': response_value,
+                        ':g': briefing_attributes['safetyCheckDigest'],
+                        ':p': current_time,
+                        ':d': input_digest
+                    }
+                    # Stamp the work order item so delta sync picks up the change
+                    sync_values = {':u': int(time.time() * 1000), ':sp': SYNC_PARTITION}
+                    if briefings_table is work_orders_table:
+                        update_expression += SYNC_STAMP_EXPRESSION
+                        expression_values.update(sync_values)
+                    # Store the safety check response and timestamp in the briefings table
+                    briefings_table.update_item(
                         Key={'work_order_id': work_order_id},
-                        UpdateExpression="set safetyCheckResponse = :r, safetyCheckPerformedAt = :p",
-                        ExpressionAttributeValues={
-                            ':r': processed_response,
-                            ':p': current_time
-                        }
+                        UpdateExpression=update_expression + remove_expression,
+                        ExpressionAttributeValues=expression_values
                     )
+                    if briefings_table is not work_orders_table:
+                        # The work order only carries a summary flag and timestamp
+                        work_orders_table.update_item(
+                            Key={'work_order_id': work_order_id},
+                            UpdateExpression="set hasSafetyCheck = :h, safetyCheckPerformedAt = :p" + SYNC_STAMP_EXPRESSION + " remove safetyCheckResponse, safetyCheckResponseRef",
+                            ExpressionAttributeValues={
+                                ':h': True,
+                                ':p': current_time,
+                                **sync_values
+                            }
+                        )
                     logger.info(f"Successfully updated WorkOrders table for work_order_id: {work_order_id} at {current_time}")
+                    if briefing_history:
+                        try:
+                            briefing_history.append(
+                                work_order_id,
+                                processed_response,
+                                current_time,
+                                digest=briefing_attributes['safetyCheckDigest']
+                            )
+                        except Exception as history_error:
+                            logger.error(f"Error appending briefing history: {str(history_error)}")
                 else:
                     logger.warning("No work_order_id found in workOrderDetails")
             elif not work_orders_table:
@@ -226,59 +632,166 @@ def handle_message(api_gateway_management, connection_id, event):
             logger.error(traceback.format_exc())
             # Continue execution even if table update fails
 
-        # Send final completion
-        request_id = f"ws-{connection_id}-{int(time.time())}"
-        send_to_client(api_gateway_management, connection_id, {
-            'type': 'final',
-            'requestId': request_id,
-            'status': 'COMPLETED',
-            'safetyCheckResponse': completion,
-            'safetyCheckPerformedAt':current_time
-        })
-        
+        # Close the lease to new followers and send final completion to everyone subscribed
+        final_recipients = [connection_id]
+        if lease_key:
+            try:
+                final_recipients = recipients.finalize(lease_store.complete(lease_key, request_id))
+            except Exception as lease_error:
+                logger.error(f"Error completing single-flight lease: {str(lease_error)}")
+                final_recipients = recipients.current()
+        for recipient in final_recipients:
+            send_to_client(api_gateway_management, recipient, {
+                'type': 'final',
+                'requestId': request_id,
+                'status': 'COMPLETED',
+                'safetyCheckResponse': processed_response,
+                'safetyCheckPerformedAt':current_time,
+                'traceStats': trace_stats
+            })
+        release_lease(lease_key, request_id)
 
-        
         return {'statusCode': 200, 'body': 'Message sent'}
                 
     except Exception as e:
         logger.error(f"handle_messageerror: {str(e)}")
         logger.error(traceback.format_exc())
+        error_recipients = recipients.current() if recipients else [connection_id]
+        for recipient in error_recipients:
+            send_to_client(api_gateway_management, recipient, {
+                'type': 'error',
+                'requestId': request_id,
+                'status': 'COMPLETED',
+                'safetyCheckResponse': "Error in performing safety check::"+str(e)
+            })
+        if admission:
+            admission.release()
+        release_lease(lease_key, request_id)
+        return {'statusCode': 500, 'body': f'Failed to process message: {str(e)}'}
+
+def finish_cancelled(api_gateway_management, recipients, gone_connections, lease_key, request_id, reason):
+    """Notify connections that are still open that the check was cancelled, and release the lease."""
+    logger.info(f"Safety check {request_id} cancelled: {reason}")
+    for recipient in recipients.current():
+        if recipient not in gone_connections:
+            send_to_client(api_gateway_management, recipient, {
+                'type': 'cancelled',
+                'requestId': request_id,
+                'status': 'CANCELLED',
+                'reason': reason
+            })
+    release_lease(lease_key, request_id)
+    return {'statusCode': 200, 'body': 'Safety check cancelled'}
+
+def handle_cancel(api_gateway_management, connection_id, message):
+    """
+    Cancel a request for this connection. A single-flight follower is only
+    unsubscribed from the leader's run and told it is cancelled. Otherwise a
+    cancellation marker is recorded on this connection, which only the run
+    started by this connection checks.
+    """
+    request_id = message.get('requestId')
+    if not request_id:
+        return {'statusCode': 400, 'body': 'requestId is required to cancel'}
+    try:
+        followed_lease_key = cancellation_registry.unfollow(connection_id, request_id)
+        if followed_lease_key:
+            lease_store.unsubscribe(followed_lease_key, connection_id)
+            logger.info(f"Unsubscribed {connection_id} from safety check {request_id}")
+            send_to_client(api_gateway_management, connection_id, {
+                'type': 'cancelled',
+                'requestId': request_id,
+                'status': 'CANCELLED',
+                'reason': 'CLIENT_CANCELLED'
+            })
+            return {'statusCode': 200, 'body': 'Unsubscribed from safety check'}
+        recorded = cancellation_registry.request_cancel(connection_id, request_id)
+    except Exception as e:
+        logger.error(f"Error recording cancellation for {request_id}: {str(e)}")
+        return {'statusCode': 500, 'body': 'Failed to cancel safety check'}
+    if not recorded:
+        return {'statusCode': 404, 'body': 'Connection not found'}
+    logger.info(f"Cancellation requested for {request_id} on {connection_id}")
+    return {'statusCode': 200, 'body': 'Cancellation requested'}
+
+def release_lease(lease_key, owner):
+    """Release a single-flight lease, logging rather than raising on failure."""
+    if not lease_key:
+        return
+    try:
+        lease_store.release(lease_key, owner)
+    except Exception as e:
+        logger.error(f"Error releasing single-flight lease {lease_key}: {str(e)}")
+
+def enqueue_safety_check(api_gateway_management, connection_id, request_context, message, user_email):
+    """Queue a validated safety check for the worker and acknowledge it with the job id."""
+    if isinstance(job_queue, InMemoryJobQueue):
+        # Nothing drains an in-memory queue inside Lambda, so run synchronously
+        logger.warning("Job mode enabled without SAFETY_CHECK_JOB_QUEUE_URL, running synchronously")
+        return handle_message(api_gateway_management, connection_id, {'body': json.dumps(message)}, user=user_email)
+
+    job = build_job(
+        connection_id,
+        request_context['domainName'],
+        request_context['stage'],
+        message,
+        user=user_email
+    )
+    try:
+        job_queue.enqueue(job)
+    except Exception as e:
+        logger.error(f"Error enqueueing safety check job: {str(e)}")
+        logger.error(traceback.format_exc())
         send_to_client(api_gateway_management, connection_id, {
             'type': 'error',
-            'requestId': request_id,
+            'requestId': job['jobId'],
             'status': 'COMPLETED',
-            'safetyCheckResponse': "Error in performing safety check::"+str(e)
+            'safetyCheckResponse': "Error in performing safety check::Unable to queue request"
         })
-        return {'statusCode': 500, 'body': f'Failed to process message: {str(e)}'}
+        return {'statusCode': 500, 'body': 'Failed to queue safety check'}
+
+    logger.info(f"Queued safety check job {job['jobId']} for {connection_id}")
+    send_to_client(api_gateway_management, connection_id, {
+        'type': 'status',
+        'requestId': job['jobId'],
+        'jobId': job['jobId'],
+        'status': 'QUEUED'
+    })
+    return {'statusCode': 200, 'body': json.dumps({'jobId': job['jobId']})}
 
 def send_to_client(api_gateway_management, connection_id, message):
-    """Send message to WebSocket client"""
+    """Send message to WebSocket client. Returns False if the connection no longer exists."""
     try:
         # Convert datetime to string before JSON serialization
         current_time = str(datetime.now())
         
-        api_gateway_management.post_to_connection(
-            ConnectionId=connection_id,
-            Data=json.dumps({
-                'message': message,
-                'sender': connection_id,
-                'timestamp': current_time  # Use string instead of datetime object
-            }, default=str)  # Add default=str to handle any other non-serializable objects
-        )
+        envelope = {
+            'message': message,
+            'sender': connection_id,
+            'timestamp': current_time  # Use string instead of datetime object
+        }
+        # Oversized messages are split into sequenced fragments
+        for frame in encode_frames(envelope):
+            api_gateway_management.post_to_connection(
+                ConnectionId=connection_id,
+                Data=frame
+            )
         
        # logger.info(f"Message sent to {connection_id}: {message['type']}")
     except api_gateway_management.exceptions.GoneException:
         # Connection is no longer valid
         logger.warning(f"Connection {connection_id} is invalid (GoneException).")
         try:
-            ws_connection_table.delete_item(Key={'connectionId': connection_id})
+            connection_registry.remove(connection_id)
         except Exception as e:
             logger.error(f"Error deleting stale connection: {str(e)}")
+        return False
     except Exception as e:
         logger.error(f"Error sending message: {str(e)}")
         logger.error(traceback.format_exc())
         # Don't re-raise the exception to prevent Lambda failure
         # This allows the function to continue processing even if one message fails
+    return True
 
 @logger.inject_lambda_context(log_event=True)
 def lambda_handler(event, context):
@@ -320,9 +833,15 @@ def lambda_handler(event, context):
             # Check if the message is a heartbeat
             if message.get('messageType') == 'heartbeat':
                 logger.info(f"Heartbeat received from {connection_id}")
+                try:
+                    if not connection_registry.touch(connection_id):
+                        logger.warning(f"Heartbeat from unregistered connection {connection_id}")
+                        return {'statusCode': 410, 'body': json.dumps({'message': 'Connection not registered'})}
+                except Exception as e:
+                    logger.error(f"Error refreshing connection ttl: {str(e)}")
                 return {
                     'statusCode': 200,
-                    'body': json.dumps({'message': 'Heartbeat received, no action taken'})
+                    'body': json.dumps({'message': 'Heartbeat received'})
                 }
                    
             # Initialize API client
@@ -330,11 +849,9 @@ def lambda_handler(event, context):
             logger.info(f"Processing message from {connection_id}")
             
             if request_context.get('domainName') and request_context.get('stage'):
-                domain_name = request_context['domainName']
-                stage = request_context['stage']
-                api_client = boto3.client(
-                    'apigatewaymanagementapi',
-                    endpoint_url=f'https://{domain_name}/{stage}'
+                api_client = get_api_gateway_management_client(
+                    request_context['domainName'],
+                    request_context['stage']
                 )
             else:
                 logger.error("Missing domainName or stage in requestContext")
@@ -350,10 +867,14 @@ def lambda_handler(event, context):
                 return {'statusCode': 403, 'body': 'Token is required'}
             
             try:
-                decoded = verify_token(token)
+                decoded = authenticate(connection_id, token)
                 user_email = decoded.get('email', 'unknown')
                 logger.info(f"Valid token for user: {user_email}")
-                return handle_message(api_client, connection_id, event)
+                if message.get('messageType') == 'cancel':
+                    return handle_cancel(api_client, connection_id, message)
+                if job_queue is not None:
+                    return enqueue_safety_check(api_client, connection_id, request_context, message, user_email)
+                return handle_message(api_client, connection_id, event, user=user_email)
             except Exception as e:
                 logger.error(f"Token verification failed: {str(e)}")
                 logger.error(traceback.format_exc())
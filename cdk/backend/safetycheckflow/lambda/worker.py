@@ -0,0 +1,36 @@
+import json
+import traceback
+from websocket import get_api_gateway_management_client, handle_message, logger
+
+
+def process_job(job: dict) -> dict:
+    """Run a queued safety check and push its frames back to the originating connection."""
+    api_client = get_api_gateway_management_client(job['domainName'], job['stage'])
+    logger.info(f"Processing safety check job {job['jobId']} for {job['connectionId']}")
+    return handle_message(
+        api_client,
+        job['connectionId'],
+        {'body': json.dumps(job['request'])},
+        request_id=job['jobId'],
+        user=job.get('user')
+    )
+
+
+def process_local_queue(job_queue, max_concurrency: int = 5) -> list:
+    """Drain an InMemoryJobQueue with the worker logic, for offline load testing."""
+    return job_queue.drain(process_job, max_concurrency=max_concurrency)
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event, context):
+    # handle_message reports agent failures to the client itself, so only
+    # unexpected errors are returned as batch item failures for redelivery
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            process_job(json.loads(record['body']))
+        except Exception as e:
+            logger.error(f"Error processing job record {record.get('messageId')}: {str(e)}")
+            logger.error(traceback.format_exc())
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
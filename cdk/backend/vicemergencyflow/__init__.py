@@ -41,6 +41,9 @@ class VicEmergencyStack(Construct):
             removal_policy=RemovalPolicy.DESTROY
         )
         
+        # emergency_feed lives in the shared code layer, the emergency alert agent uses it too
+        shared_code_layer = core.CoreSharedCodeLayer(self, "EmergencySharedCode")
+
         # a lambda function process the customer's question
         emergency_check_request_fn = lambda_python.PythonFunction(
             self,
@@ -52,6 +55,7 @@ class VicEmergencyStack(Construct):
             runtime=lambda_.Runtime.PYTHON_3_13,
             timeout=Duration.seconds(90),
             memory_size=512,
+            layers=[shared_code_layer],
             environment={
                 "LOG_LEVEL": "DEBUG",
                 "POWERTOOLS_SERVICE_NAME": "EmergencyCheckFlow",
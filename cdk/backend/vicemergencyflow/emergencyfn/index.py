@@ -1,6 +1,16 @@
+import os
 import json
-import urllib3
 import math
+from emergency_feed import EmergencyFeed, DEFAULT_FEED_URL
+
+# Parsed feed shared across warm invocations, see EmergencyFeed
+emergency_feed = EmergencyFeed(
+    url=os.environ.get("EMERGENCY_FEED_URL", DEFAULT_FEED_URL),
+    ttl_seconds=int(os.environ.get("EMERGENCY_FEED_TTL_SECONDS", "60")),
+    max_stale_seconds=int(os.environ.get("EMERGENCY_FEED_MAX_STALE_SECONDS", "3600")),
+    connect_timeout=float(os.environ.get("EMERGENCY_FEED_CONNECT_TIMEOUT_SECONDS", "3")),
+    read_timeout=float(os.environ.get("EMERGENCY_FEED_READ_TIMEOUT_SECONDS", "10")),
+)
 
 def lambda_handler(event, context):
     event_body = json.loads(event["body"])
@@ -9,14 +19,9 @@ def lambda_handler(event, context):
     lon = float(event_body['longitude'])
     search_point = (lon, lat)
 
-    # Download the GeoJSON data
-    http = urllib3.PoolManager()
-    response = http.request('GET', 'https://emergency.vic.gov.au/public/events-geojson.json')
-    geojson_data = json.loads(response.data.decode('utf-8'))
-    
     relevant_incidents = []
     
-    for feature in geojson_data['features']:
+    for feature in emergency_feed.features():
         geometry = feature['geometry']
         
         if geometry['type'] == 'GeometryCollection':
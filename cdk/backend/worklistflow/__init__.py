@@ -0,0 +1,206 @@
+import os
+
+from aws_cdk import (
+    Stack,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_lambda_python_alpha as lambda_python,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_dynamodb as dynamodb,
+    aws_sqs as sqs,
+    Duration,
+    RemovalPolicy,
+    aws_logs as logs,
+)
+from constructs import Construct
+
+import core_constructs as core
+
+from cdk_nag import NagSuppressions
+
+
+class WorklistStack(Construct):
+    """
+    Materialized per-technician daily worklists (worklist#{owner}#{date}),
+    kept current from the WorkOrders and Locations table streams.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        dynamo_db_workorder_table: str,
+        dynamo_db_location_table: str,
+        workorder_table_stream_arn: str,
+        location_table_stream_arn: str,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.worklist_table = core.CoreTable(
+            self,
+            "WorklistTable",
+            partition_key=dynamodb.Attribute(
+                name="worklist_key", type=dynamodb.AttributeType.STRING
+            ),
+        )
+
+        # Define function name first
+        function_name = f"{construct_id.lower()}-worklist-stream"
+
+        # Create explicit log group for the stream handler
+        worklist_log_group = logs.LogGroup(
+            self,
+            "WorklistLogGroup",
+            log_group_name=f"/aws/lambda/{function_name}",
+            retention=logs.RetentionDays.ONE_WEEK,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        worklist_fn = lambda_python.PythonFunction(
+            self,
+            "WorklistStreamFunction",
+            function_name=function_name,
+            entry=f"{os.path.dirname(os.path.realpath(__file__))}/worklist",
+            index="index.py",
+            handler="lambda_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            timeout=Duration.seconds(60),
+            memory_size=256,
+            environment={
+                "LOG_LEVEL": "INFO",
+                "POWERTOOLS_SERVICE_NAME": "WorklistService",
+                "WorklistTableName": self.worklist_table.table_name,
+                "WorkOrderTableName": dynamo_db_workorder_table,
+                "LocationTableName": dynamo_db_location_table,
+            },
+        )
+
+        worklist_fn_policy = iam.Policy(self, "WorklistFnPolicy")
+
+        workorder_table_arn = f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_workorder_table}"
+        location_table_arn = f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_location_table}"
+
+        worklist_fn_policy.add_statements(
+            iam.PolicyStatement(
+                sid="SourceTableRead",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "dynamodb:GetItem",
+                    "dynamodb:Query",
+                    # Backfill invocations scan WorkOrders
+                    "dynamodb:Scan",
+                ],
+                resources=[
+                    workorder_table_arn,
+                    location_table_arn,
+                    f"{workorder_table_arn}/index/*",
+                ],
+            ),
+            iam.PolicyStatement(
+                sid="WorklistTableWrite",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "dynamodb:GetItem",
+                    "dynamodb:PutItem",
+                    "dynamodb:UpdateItem",
+                ],
+                resources=[self.worklist_table.table_arn],
+            ),
+            iam.PolicyStatement(
+                sid="SourceStreamRead",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "dynamodb:DescribeStream",
+                    "dynamodb:GetRecords",
+                    "dynamodb:GetShardIterator",
+                    "dynamodb:ListStreams",
+                ],
+                resources=[workorder_table_stream_arn, location_table_stream_arn],
+            ),
+            iam.PolicyStatement(
+                sid="CloudWatchLogsAccess",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "logs:CreateLogStream",
+                    "logs:PutLogEvents",
+                ],
+                resources=[worklist_log_group.log_group_arn],
+            ),
+        )
+
+        # Attach the IAM policy to the Lambda function's role
+        worklist_fn.role.attach_inline_policy(worklist_fn_policy)
+
+        # Records still failing after every retry are described here (shard,
+        # sequence range) instead of being dropped silently; replay them, or run
+        # a backfill, once the cause is fixed
+        stream_failure_queue = sqs.Queue(
+            self,
+            "WorklistStreamFailureQueue",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.days(14),
+        )
+
+        # One mapping per source table; a failed record is retried from its
+        # sequence number so later changes to the same item are not applied first.
+        # Reading from the trim horizon picks up changes still in the stream;
+        # older work orders are added with a backfill invocation (see README).
+        for mapping_id, stream_arn in (
+            ("WorkOrdersStreamMapping", workorder_table_stream_arn),
+            ("LocationsStreamMapping", location_table_stream_arn),
+        ):
+            mapping = lambda_.EventSourceMapping(
+                self,
+                mapping_id,
+                target=worklist_fn,
+                event_source_arn=stream_arn,
+                starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+                batch_size=100,
+                max_batching_window=Duration.seconds(1),
+                bisect_batch_on_error=False,
+                retry_attempts=10,
+                report_batch_item_failures=True,
+                on_failure=lambda_event_sources.SqsDlq(stream_failure_queue),
+            )
+            mapping.node.add_dependency(worklist_fn_policy)
+
+        NagSuppressions.add_resource_suppressions(
+            stream_failure_queue,
+            [
+                {
+                    "id": "AwsSolutions-SQS3",
+                    "reason": "This queue is the on-failure destination of the stream mappings.",
+                }
+            ],
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            worklist_fn_policy,
+            [
+                {
+                    "id": "AwsSolutions-IAM5",
+                    "reason": "The stream handler queries the WorkOrders LocationIndex, which needs the index wildcard.",
+                }
+            ],
+            True,
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            worklist_fn,
+            [
+                {
+                    "id": "AwsSolutions-IAM4",
+                    "reason": """Prototype will use managed policies to expedite development.
+                        TODO: Replace on Production environment (Path to Production)""",
+                    "appliesTo": [
+                        "Policy::arn:<AWS::Partition>:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+                    ],
+                },
+                {
+                    "id": "AwsSolutions-L1",
+                    "reason": """Policy managed by AWS can not specify a different runtime version""",
+                },
+            ],
+            True,
+        )
@@ -0,0 +1,59 @@
+import os
+import boto3
+from aws_lambda_powertools import Logger, Tracer
+from worklist_view import DynamoDBWorklistStore, WorklistProcessor
+
+
+dynamodb = boto3.resource('dynamodb')
+WorklistTableName = os.getenv("WorklistTableName")
+WorkOrderTableName = os.getenv("WorkOrderTableName")
+LocationTableName = os.getenv("LocationTableName")
+store = DynamoDBWorklistStore(
+    dynamodb.Table(WorklistTableName),
+    dynamodb.Table(WorkOrderTableName),
+    dynamodb.Table(LocationTableName)
+)
+processor = WorklistProcessor(store, WorkOrderTableName, LocationTableName)
+
+# A backfill stops scanning with this much of the invocation left
+BACKFILL_MIN_REMAINING_MS = 15000
+
+# Initialize Powertools utilities
+POWERTOOLS_SERVICE_NAME = os.getenv("POWERTOOLS_SERVICE_NAME")
+logger = Logger(service=POWERTOOLS_SERVICE_NAME)
+tracer = Tracer(service=POWERTOOLS_SERVICE_NAME)
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """DynamoDB stream handler for the WorkOrders and Locations tables."""
+    if event.get('backfill'):
+        return backfill_handler(event, context)
+    records = event.get('Records', [])
+    failures = processor.process_batch(records)
+    logger.info(f"Processed {len(records)} stream records, {len(failures)} failed")
+    return {'batchItemFailures': failures}
+
+
+def backfill_handler(event, context):
+    """
+    {"backfill": true} scans WorkOrders into the worklists until the invocation
+    is nearly out of time. If the scan is not finished, the response carries
+    exclusive_start_key; invoke again with it added to the event to continue.
+    """
+    exclusive_start_key = event.get('exclusive_start_key')
+    scanned = 0
+    written = 0
+    while True:
+        work_orders, exclusive_start_key = store.scan_work_orders(exclusive_start_key)
+        scanned += len(work_orders)
+        written += processor.backfill(work_orders)
+        if not exclusive_start_key or context.get_remaining_time_in_millis() < BACKFILL_MIN_REMAINING_MS:
+            break
+    logger.info(f"Backfill scanned {scanned} work orders, wrote {written} worklist entries")
+    return {
+        'scanned': scanned,
+        'written': written,
+        'exclusive_start_key': exclusive_start_key,
+    }
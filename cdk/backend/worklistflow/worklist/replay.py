@@ -0,0 +1,101 @@
+"""
+Replay DynamoDB stream records against an in-memory worklist store, with no AWS
+access needed:
+
+    python replay.py records.json
+
+records.json is a list of either raw stream records (as delivered to the
+Lambda) or shorthand changes:
+
+    {"table": "work_orders" | "locations", "old": {...} | null, "new": {...} | null}
+
+The resulting worklists are printed as JSON.
+"""
+import sys
+import json
+from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
+from worklist_view import InMemoryWorklistStore, WorklistProcessor, deserialize_image
+
+WORK_ORDERS_TABLE_NAME = "work-orders"
+LOCATIONS_TABLE_NAME = "locations"
+TABLE_NAMES = {'work_orders': WORK_ORDERS_TABLE_NAME, 'locations': LOCATIONS_TABLE_NAME}
+KEY_ATTRIBUTES = {'work_orders': 'work_order_id', 'locations': 'location_name'}
+
+_serializer = TypeSerializer()
+
+
+def _serialize_image(item):
+    if item is None:
+        return None
+    # TypeSerializer rejects floats; JSON numbers are loaded as Decimal
+    item = json.loads(json.dumps(item), parse_float=Decimal)
+    return {key: _serializer.serialize(value) for key, value in item.items()}
+
+
+def stream_record(table: str, old=None, new=None, sequence_number: int = 0) -> dict:
+    """A NEW_AND_OLD_IMAGES stream record for a change to work_orders or locations."""
+    if old is None:
+        event_name = 'INSERT'
+    elif new is None:
+        event_name = 'REMOVE'
+    else:
+        event_name = 'MODIFY'
+    key_attribute = KEY_ATTRIBUTES[table]
+    key = (new or old)[key_attribute]
+    dynamodb = {
+        'Keys': {key_attribute: {'S': key}},
+        'SequenceNumber': str(sequence_number),
+        'StreamViewType': 'NEW_AND_OLD_IMAGES',
+    }
+    if old is not None:
+        dynamodb['OldImage'] = _serialize_image(old)
+    if new is not None:
+        dynamodb['NewImage'] = _serialize_image(new)
+    return {
+        'eventID': f"replay-{sequence_number}",
+        'eventName': event_name,
+        'eventSource': 'aws:dynamodb',
+        'eventSourceARN': f"arn:aws:dynamodb:local:000000000000:table/{TABLE_NAMES[table]}/stream/replay",
+        'dynamodb': dynamodb,
+    }
+
+
+def replay(records, store=None) -> InMemoryWorklistStore:
+    """
+    Apply records in order. Each change is written to the store's source tables
+    before it is processed, as it is in DynamoDB by the time the record arrives.
+    """
+    store = store or InMemoryWorklistStore()
+    processor = WorklistProcessor(store, WORK_ORDERS_TABLE_NAME, LOCATIONS_TABLE_NAME)
+    for sequence_number, record in enumerate(records, start=1):
+        if 'dynamodb' not in record:
+            record = stream_record(record['table'], record.get('old'), record.get('new'), sequence_number)
+        source = processor.source_of(record)
+        if source:
+            images = record['dynamodb']
+            new = deserialize_image(images.get('NewImage'))
+            old = deserialize_image(images.get('OldImage'))
+            source_table = store.work_orders if source == 'work_orders' else store.locations
+            key = (new or old)[KEY_ATTRIBUTES[source]]
+            if new is None:
+                source_table.pop(key, None)
+            else:
+                source_table[key] = new
+        failures = processor.process_batch([record])
+        if failures:
+            raise RuntimeError(f"Record {record.get('eventID')} failed")
+    return store
+
+
+def main(path: str):
+    with open(path) as f:
+        records = json.load(f)
+    store = replay(records)
+    print(json.dumps(store.worklists, indent=2, sort_keys=True, default=str))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python replay.py records.json")
+    main(sys.argv[1])
@@ -0,0 +1,292 @@
+import time
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+# WorkOrders GSI used to find the work orders at a changed location
+LOCATION_INDEX = "LocationIndex"
+# Locations item the data import uses for its version stamp, not a location
+LOCATIONS_META_KEY = '__meta__'
+# Work order attributes copied into each worklist entry
+ENTRY_ATTRIBUTES = (
+    'work_order_id', 'description', 'status', 'priority', 'location_name', 'asset_id',
+    'scheduled_start_timestamp', 'scheduled_finish_timestamp',
+)
+# Briefing HTML lives on the work order item until the briefings table takes over
+BRIEFING_ATTRIBUTES = ('safetyCheckResponse', 'safetyCheckResponseRef')
+# Location attributes embedded in each entry
+LOCATION_ATTRIBUTES = ('latitude', 'longitude')
+
+_deserializer = TypeDeserializer()
+
+
+def worklist_key(owner: str, date: str) -> str:
+    return f"worklist#{owner}#{date}"
+
+
+def view_of(order):
+    """(owner, date) of the worklist a work order belongs on, or None."""
+    if not order or order.get('deleted'):
+        return None
+    owner = order.get('owner_name')
+    start = order.get('scheduled_start_timestamp')
+    if not owner or not start:
+        return None
+    return owner, str(start)[:10]
+
+
+def order_entry(order) -> dict:
+    """Worklist entry for a work order, without its location."""
+    entry = {attr: order[attr] for attr in ENTRY_ATTRIBUTES if attr in order}
+    entry['hasSafetyCheck'] = (
+        bool(order.get('hasSafetyCheck'))
+        or bool(order.get('safetyCheckPerformedAt'))
+        or any(order.get(attr) for attr in BRIEFING_ATTRIBUTES)
+    )
+    if order.get('safetyCheckPerformedAt'):
+        entry['safetyCheckPerformedAt'] = order['safetyCheckPerformedAt']
+    return entry
+
+
+def location_entry(location) -> dict:
+    """Location attributes embedded in an entry; None values for a missing location."""
+    return {attr: (location or {}).get(attr) for attr in LOCATION_ATTRIBUTES}
+
+
+def deserialize_image(image):
+    """Plain item from a stream record's DynamoDB-JSON image."""
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+class DynamoDBWorklistStore:
+    """
+    Worklists table of items keyed by worklist_key, each holding a work_orders
+    map of entries keyed by work_order_id. Entries are set and removed one at a
+    time with map-path updates, so concurrent changes to different work orders
+    on the same worklist do not overwrite each other.
+    """
+
+    def __init__(self, worklist_table, work_orders_table, locations_table):
+        self._worklist_table = worklist_table
+        self._work_orders_table = work_orders_table
+        self._locations_table = locations_table
+
+    def get_location(self, location_name: str):
+        return self._locations_table.get_item(Key={'location_name': location_name}).get('Item')
+
+    def work_orders_at_location(self, location_name: str) -> list:
+        query_kwargs = {
+            'IndexName': LOCATION_INDEX,
+            'KeyConditionExpression': Key('location_name').eq(location_name),
+        }
+        items = []
+        while True:
+            response = self._work_orders_table.query(**query_kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def put_entry(self, owner: str, date: str, entry: dict):
+        key = worklist_key(owner, date)
+        updated_at = int(time.time() * 1000)
+        while True:
+            try:
+                self._worklist_table.update_item(
+                    Key={'worklist_key': key},
+                    UpdateExpression="SET work_orders.#id = :e, updated_at = :u",
+                    ConditionExpression="attribute_exists(work_orders)",
+                    ExpressionAttributeNames={'#id': entry['work_order_id']},
+                    ExpressionAttributeValues={':e': entry, ':u': updated_at}
+                )
+                return
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+            # First entry on this worklist: create it, unless another writer just did
+            try:
+                self._worklist_table.put_item(
+                    Item={
+                        'worklist_key': key,
+                        'owner_name': owner,
+                        'date': date,
+                        'work_orders': {entry['work_order_id']: entry},
+                        'updated_at': updated_at,
+                    },
+                    ConditionExpression="attribute_not_exists(worklist_key)"
+                )
+                return
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+    def remove_entry(self, owner: str, date: str, work_order_id: str):
+        try:
+            self._worklist_table.update_item(
+                Key={'worklist_key': worklist_key(owner, date)},
+                UpdateExpression="REMOVE work_orders.#id SET updated_at = :u",
+                ConditionExpression="attribute_exists(work_orders)",
+                ExpressionAttributeNames={'#id': work_order_id},
+                ExpressionAttributeValues={':u': int(time.time() * 1000)}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def get_worklist(self, owner: str, date: str):
+        return self._worklist_table.get_item(Key={'worklist_key': worklist_key(owner, date)}).get('Item')
+
+    def scan_work_orders(self, exclusive_start_key=None):
+        """One page of the WorkOrders table and its LastEvaluatedKey (None on the last page)."""
+        scan_kwargs = {'ExclusiveStartKey': exclusive_start_key} if exclusive_start_key else {}
+        response = self._work_orders_table.scan(**scan_kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+
+class InMemoryWorklistStore:
+    """
+    Dict-backed store for local replays. work_orders and locations stand in for
+    the source tables and are kept current by the replay as records are applied.
+    """
+
+    def __init__(self):
+        self.work_orders = {}
+        self.locations = {}
+        self.worklists = {}
+
+    def get_location(self, location_name: str):
+        return self.locations.get(location_name)
+
+    def work_orders_at_location(self, location_name: str) -> list:
+        return [order for order in self.work_orders.values() if order.get('location_name') == location_name]
+
+    def put_entry(self, owner: str, date: str, entry: dict):
+        worklist = self.worklists.setdefault(worklist_key(owner, date), {
+            'worklist_key': worklist_key(owner, date),
+            'owner_name': owner,
+            'date': date,
+            'work_orders': {},
+        })
+        worklist['work_orders'][entry['work_order_id']] = entry
+        worklist['updated_at'] = int(time.time() * 1000)
+
+    def remove_entry(self, owner: str, date: str, work_order_id: str):
+        worklist = self.worklists.get(worklist_key(owner, date))
+        if worklist:
+            worklist['work_orders'].pop(work_order_id, None)
+            worklist['updated_at'] = int(time.time() * 1000)
+
+    def get_worklist(self, owner: str, date: str):
+        return self.worklists.get(worklist_key(owner, date))
+
+    def scan_work_orders(self, exclusive_start_key=None):
+        return list(self.work_orders.values()), None
+
+
+class WorklistProcessor:
+    """
+    Applies WorkOrders and Locations stream records to the worklist view.
+
+    A work order change removes its entry from the worklist it was on (old
+    image) and writes it to the one it is on now (new image), so owner and
+    date moves are handled. A location change rewrites the entries of every
+    work order at that location, found through LocationIndex. Changes that do
+    not affect any entry attribute are skipped.
+    """
+
+    def __init__(self, store, work_orders_table_name: str, locations_table_name: str):
+        self._store = store
+        self._work_orders_table_name = work_orders_table_name
+        self._locations_table_name = locations_table_name
+
+    def source_of(self, record) -> str:
+        """'work_orders' or 'locations' from the record's stream ARN, else None."""
+        arn = record.get('eventSourceARN', '')
+        if f":table/{self._work_orders_table_name}/stream/" in arn:
+            return 'work_orders'
+        if f":table/{self._locations_table_name}/stream/" in arn:
+            return 'locations'
+        return None
+
+    def process(self, record):
+        images = record.get('dynamodb', {})
+        old = deserialize_image(images.get('OldImage'))
+        new = deserialize_image(images.get('NewImage'))
+        source = self.source_of(record)
+        if source == 'work_orders':
+            self.work_order_changed(old, new)
+        elif source == 'locations':
+            self.location_changed(old, new)
+        else:
+            logger.warning(f"Ignoring record from {record.get('eventSourceARN')}")
+
+    def work_order_changed(self, old, new):
+        old_view = view_of(old)
+        new_view = view_of(new)
+        if old_view and new_view == old_view and order_entry(old) == order_entry(new):
+            return
+        if old_view and old_view != new_view:
+            self._store.remove_entry(*old_view, old['work_order_id'])
+            logger.info(f"Removed {old['work_order_id']} from {worklist_key(*old_view)}")
+        if new_view:
+            entry = order_entry(new)
+            if new.get('location_name'):
+                entry.update(location_entry(self._store.get_location(new['location_name'])))
+            self._store.put_entry(*new_view, entry)
+            logger.info(f"Updated {new['work_order_id']} on {worklist_key(*new_view)}")
+
+    def location_changed(self, old, new):
+        location_name = (new or old or {}).get('location_name')
+        if not location_name or location_name == LOCATIONS_META_KEY:
+            return
+        if location_entry(old) == location_entry(new):
+            return
+        coordinates = location_entry(new)
+        orders = self._store.work_orders_at_location(location_name)
+        for order in orders:
+            view = view_of(order)
+            if view:
+                self._store.put_entry(*view, {**order_entry(order), **coordinates})
+        logger.info(f"Location {location_name} changed, updated {len(orders)} work orders")
+
+    def backfill(self, work_orders) -> int:
+        """
+        Write the entry of every given work order, as an INSERT record would.
+        Builds worklists for work orders whose changes are no longer in the
+        stream, such as those written before the stream mapping existed.
+        Returns the number of entries written.
+        """
+        locations = {}
+        written = 0
+        for order in work_orders:
+            view = view_of(order)
+            if not view:
+                continue
+            entry = order_entry(order)
+            location_name = order.get('location_name')
+            if location_name:
+                if location_name not in locations:
+                    locations[location_name] = self._store.get_location(location_name)
+                entry.update(location_entry(locations[location_name]))
+            self._store.put_entry(*view, entry)
+            written += 1
+        return written
+
+    def process_batch(self, records) -> list:
+        """
+        Process records in order, stopping at the first failure. Returns the
+        batchItemFailures for the failed record; Lambda checkpoints before it
+        and retries from there, so per-item ordering is kept.
+        """
+        for record in records:
+            try:
+                self.process(record)
+            except Exception as e:
+                logger.error(f"Error processing stream record {record.get('eventID')}: {str(e)}")
+                return [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]
+        return []
@@ -27,11 +27,16 @@ class WorkOrderApiStack(Construct):
         api_gateway: core.CoreApiGateway,
         dynamo_db_workorder_table: str,
         dynamo_db_location_table: str,
+        dynamo_db_briefings_table: str = None,
+        dynamo_db_briefing_history_table: str = None,
+        data_bucket_name: str = None,
+        dynamo_db_worklist_table: str = None,
     ) -> None:
         super().__init__(scope, construct_id)
 
         # Define function name first
         function_name = f"{construct_id.lower()}-get-workorders"
+        export_function_name = f"{construct_id.lower()}-export-workorders"
         
         # Create explicit log group for work order function
         work_order_log_group = logs.LogGroup(
@@ -42,6 +47,9 @@ class WorkOrderApiStack(Construct):
             removal_policy=RemovalPolicy.DESTROY
         )
         
+        # geohash and briefing_history come from the shared code layer
+        shared_code_layer = core.CoreSharedCodeLayer(self, "WorkOrderSharedCode")
+
         # a lambda function process the customer's question
         work_order_fn = lambda_python.PythonFunction(
             self,
@@ -53,11 +61,18 @@ class WorkOrderApiStack(Construct):
             runtime=lambda_.Runtime.PYTHON_3_13,
             timeout=Duration.seconds(90),
             memory_size=512,
+            layers=[shared_code_layer],
             environment={
                 "LOG_LEVEL": "DEBUG",
                 "POWERTOOLS_SERVICE_NAME": "WorkOrdersService",
                 "WorkOrderTableName": dynamo_db_workorder_table,
                 "LocationTableName": dynamo_db_location_table,
+                "BriefingsTableName": dynamo_db_briefings_table or "",
+                "BriefingHistoryTableName": dynamo_db_briefing_history_table or "",
+                "DataBucketName": data_bucket_name or "",
+                "WorklistTableName": dynamo_db_worklist_table or "",
+                "EXPORT_SEGMENTS": "8",
+                "ExportFunctionName": export_function_name if data_bucket_name else "",
             },
         )
 
@@ -67,6 +82,24 @@ class WorkOrderApiStack(Construct):
         # Create ARNs for the DynamoDB tables and their indexes
         workorder_table_arn = f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_workorder_table}"
         location_table_arn = f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_location_table}"
+        dynamodb_resources = [
+            workorder_table_arn,
+            location_table_arn,
+            f"{workorder_table_arn}/index/*",
+            f"{location_table_arn}/index/*"
+        ]
+        if dynamo_db_briefings_table:
+            dynamodb_resources.append(
+                f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_briefings_table}"
+            )
+        if dynamo_db_briefing_history_table:
+            dynamodb_resources.append(
+                f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_briefing_history_table}"
+            )
+        if dynamo_db_worklist_table:
+            dynamodb_resources.append(
+                f"arn:aws:dynamodb:{Stack.of(self).region}:{Stack.of(self).account}:table/{dynamo_db_worklist_table}"
+            )
         
         work_order_fn_policy.add_statements(
             iam.PolicyStatement(
@@ -78,12 +111,7 @@ class WorkOrderApiStack(Construct):
                     "dynamodb:Query",
                     "dynamodb:Scan"
                 ],
-                resources=[
-                    workorder_table_arn,
-                    location_table_arn,
-                    f"{workorder_table_arn}/index/*",
-                    f"{location_table_arn}/index/*"
-                ],
+                resources=dynamodb_resources,
             ),
             iam.PolicyStatement(
                 sid="CloudWatchLogsAccess",
@@ -96,9 +124,127 @@ class WorkOrderApiStack(Construct):
             ),
         )
 
+        if data_bucket_name:
+            work_order_fn_policy.add_statements(
+                iam.PolicyStatement(
+                    sid="BriefingObjectAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=["s3:GetObject"],
+                    resources=[f"arn:aws:s3:::{data_bucket_name}/briefings/*"],
+                ),
+                # Manifests: written when an export starts and read for its status
+                iam.PolicyStatement(
+                    sid="ExportManifestAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "s3:GetObject",
+                        "s3:PutObject",
+                    ],
+                    resources=[f"arn:aws:s3:::{data_bucket_name}/exports/work_orders/*"],
+                ),
+                iam.PolicyStatement(
+                    sid="ExportInvoke",
+                    effect=iam.Effect.ALLOW,
+                    actions=["lambda:InvokeFunction"],
+                    resources=[
+                        f"arn:aws:lambda:{Stack.of(self).region}:{Stack.of(self).account}:function:{export_function_name}"
+                    ],
+                ),
+            )
+
         # Attach the IAM policy to the Lambda function's role
         work_order_fn.role.attach_inline_policy(work_order_fn_policy)
 
+        if data_bucket_name:
+            # Full-table exports run asynchronously in their own function, so the
+            # API function keeps a short timeout
+            export_log_group = logs.LogGroup(
+                self,
+                "ExportWorkOrdersLogGroup",
+                log_group_name=f"/aws/lambda/{export_function_name}",
+                retention=logs.RetentionDays.ONE_WEEK,
+                removal_policy=RemovalPolicy.DESTROY
+            )
+            export_fn = lambda_python.PythonFunction(
+                self,
+                "Export WorkOrders",
+                function_name=export_function_name,
+                entry=f"{os.path.dirname(os.path.realpath(__file__))}/workorders",
+                index="export_job.py",
+                handler="lambda_handler",
+                runtime=lambda_.Runtime.PYTHON_3_13,
+                timeout=Duration.minutes(15),
+                memory_size=1024,
+                # Failed exports record FAILED in their manifest; retrying would rescan
+                retry_attempts=0,
+                environment={
+                    "LOG_LEVEL": "INFO",
+                    "POWERTOOLS_SERVICE_NAME": "WorkOrdersExport",
+                    "WorkOrderTableName": dynamo_db_workorder_table,
+                    "DataBucketName": data_bucket_name,
+                    "EXPORT_SEGMENTS": "8",
+                    "EXPORT_MAX_WORKERS": "8",
+                },
+            )
+            export_fn_policy = iam.Policy(self, "ExportWorkOrdersFnPolicy")
+            export_fn_policy.add_statements(
+                iam.PolicyStatement(
+                    sid="DynamoDBScan",
+                    effect=iam.Effect.ALLOW,
+                    actions=["dynamodb:Scan"],
+                    resources=[workorder_table_arn],
+                ),
+                iam.PolicyStatement(
+                    sid="ExportObjectAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "s3:GetObject",
+                        "s3:PutObject",
+                        "s3:AbortMultipartUpload",
+                    ],
+                    resources=[f"arn:aws:s3:::{data_bucket_name}/exports/work_orders/*"],
+                ),
+                iam.PolicyStatement(
+                    sid="CloudWatchLogsAccess",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "logs:CreateLogStream",
+                        "logs:PutLogEvents",
+                    ],
+                    resources=[export_log_group.log_group_arn],
+                ),
+            )
+            export_fn.role.attach_inline_policy(export_fn_policy)
+
+            NagSuppressions.add_resource_suppressions(
+                export_fn_policy,
+                [
+                    NagPackSuppression(
+                        id="AwsSolutions-IAM5",
+                        reason="Export parts are written under a per-export prefix in the data bucket.",
+                    )
+                ],
+                True,
+            )
+            NagSuppressions.add_resource_suppressions(
+                export_fn,
+                [
+                    {
+                        "id": "AwsSolutions-IAM4",
+                        "reason": """Prototype will use managed policies to expedite development. 
+                        TODO: Replace on Production environment (Path to Production)""",
+                        "appliesTo": [
+                            "Policy::arn:<AWS::Partition>:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+                        ],
+                    },
+                    {
+                        "id": "AwsSolutions-L1",
+                        "reason": """Policy managed by AWS can not specify a different runtime version""",
+                    },
+                ],
+                True,
+            )
+
         NagSuppressions.add_resource_suppressions(
             work_order_fn_policy,
             [
@@ -118,6 +264,36 @@ class WorkOrderApiStack(Construct):
             request_validator=api_gateway.request_body_validator,
         )
 
+        # Lazy retrieval of the stored safety briefing for one work order
+        api_gateway.add_method(
+            resource_path="/workorders/{work_order_id}/briefing",
+            http_method="GET",
+            lambda_function=work_order_fn,
+            request_validator=api_gateway.request_params_validator,
+            request_parameters={"method.request.path.work_order_id": True},
+        )
+
+        # Work orders near a point, nearest first, from the Locations GeohashIndex
+        api_gateway.add_method(
+            resource_path="/workorders/near",
+            http_method="POST",
+            lambda_function=work_order_fn,
+            request_validator=api_gateway.request_body_validator,
+        )
+
+        # Briefing audit trail: latest versions (?limit=N) or a diff against the previous one (?diff=true)
+        api_gateway.add_method(
+            resource_path="/workorders/{work_order_id}/briefing/history",
+            http_method="GET",
+            lambda_function=work_order_fn,
+            request_validator=api_gateway.request_params_validator,
+            request_parameters={
+                "method.request.path.work_order_id": True,
+                "method.request.querystring.limit": False,
+                "method.request.querystring.diff": False,
+            },
+        )
+
         NagSuppressions.add_resource_suppressions(
             work_order_fn,
             [
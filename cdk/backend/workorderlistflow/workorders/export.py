@@ -0,0 +1,155 @@
+import os
+import json
+import gzip
+import time
+import tempfile
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+# Exports live in the data bucket next to the deployed CSV files; they survive
+# redeploys only because that BucketDeployment does not prune (prune=False)
+EXPORT_PREFIX = "exports/work_orders"
+
+
+def export_prefix(export_id: str) -> str:
+    return f"{EXPORT_PREFIX}/{export_id}"
+
+
+def manifest_key(export_id: str) -> str:
+    return f"{export_prefix(export_id)}/manifest.json"
+
+
+def write_manifest(s3_client, bucket: str, export_id: str, manifest: dict):
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=manifest_key(export_id),
+        Body=json.dumps(manifest, default=str).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+
+def read_manifest(s3_client, bucket: str, export_id: str):
+    """The export's manifest, or None if there is none."""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=manifest_key(export_id))
+    except ClientError as e:
+        # Without s3:ListBucket a missing key is reported as AccessDenied, not NoSuchKey
+        if e.response['Error']['Code'] in ('NoSuchKey', 'AccessDenied', '404', '403'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+
+def running_manifest(export_id: str, table_name: str, total_segments: int, started_at: str) -> dict:
+    return {
+        'export_id': export_id,
+        'status': 'RUNNING',
+        'table': table_name,
+        'total_segments': total_segments,
+        'started_at': started_at,
+    }
+
+
+def _export_segment(table_name: str, bucket: str, export_id: str, segment: int, total_segments: int) -> dict:
+    """Scan one segment to a gzip NDJSON part in S3 and return its throughput stats."""
+    # boto3 resources are not thread-safe, so each segment gets its own session
+    session = boto3.session.Session()
+    table = session.resource('dynamodb').Table(table_name)
+    s3_client = session.client('s3')
+
+    key = f"{export_prefix(export_id)}/part-{segment:04d}.ndjson.gz"
+    started = time.monotonic()
+    items = 0
+    pages = 0
+    consumed_capacity = 0.0
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ReturnConsumedCapacity': 'TOTAL',
+    }
+    with tempfile.NamedTemporaryFile(suffix='.ndjson.gz') as part_file:
+        with gzip.open(part_file, 'wt', encoding='utf-8') as out:
+            while True:
+                response = table.scan(**scan_kwargs)
+                pages += 1
+                consumed_capacity += float(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+                for item in response.get('Items', []):
+                    out.write(json.dumps(item, default=str, separators=(',', ':')))
+                    out.write('\n')
+                    items += 1
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        part_file.flush()
+        compressed_bytes = os.path.getsize(part_file.name)
+        # upload_file switches to multipart for large parts
+        s3_client.upload_file(part_file.name, bucket, key, ExtraArgs={'ContentType': 'application/x-ndjson', 'ContentEncoding': 'gzip'})
+
+    seconds = time.monotonic() - started
+    stats = {
+        'segment': segment,
+        'key': key,
+        'items': items,
+        'pages': pages,
+        'compressed_bytes': compressed_bytes,
+        'consumed_capacity': consumed_capacity,
+        'seconds': round(seconds, 3),
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else items,
+    }
+    logger.info(f"Export {export_id} segment {segment}/{total_segments}: {stats}")
+    return stats
+
+
+def export_table(table_name: str, bucket: str, export_id: str, total_segments: int, max_workers: int) -> dict:
+    """
+    Parallel scan of a table into gzip NDJSON parts under exports/work_orders/<export_id>/,
+    one part per segment, followed by a manifest.json with per-segment throughput.
+    """
+    s3_client = boto3.client('s3')
+    started_at = datetime.now(timezone.utc).isoformat()
+    started = time.monotonic()
+    write_manifest(s3_client, bucket, export_id, running_manifest(export_id, table_name, total_segments, started_at))
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, total_segments)) as executor:
+            futures = [
+                executor.submit(_export_segment, table_name, bucket, export_id, segment, total_segments)
+                for segment in range(total_segments)
+            ]
+            segments = [future.result() for future in futures]
+    except Exception as e:
+        logger.exception(f"Export {export_id} failed")
+        write_manifest(s3_client, bucket, export_id, {
+            'export_id': export_id,
+            'status': 'FAILED',
+            'table': table_name,
+            'total_segments': total_segments,
+            'started_at': started_at,
+            'error': str(e),
+        })
+        raise
+
+    seconds = time.monotonic() - started
+    items = sum(segment['items'] for segment in segments)
+    manifest = {
+        'export_id': export_id,
+        'status': 'COMPLETED',
+        'table': table_name,
+        'format': 'ndjson+gzip',
+        'total_segments': total_segments,
+        'started_at': started_at,
+        'completed_at': datetime.now(timezone.utc).isoformat(),
+        'items': items,
+        'seconds': round(seconds, 3),
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else items,
+        'parts': [segment['key'] for segment in segments],
+        'segments': segments,
+    }
+    write_manifest(s3_client, bucket, export_id, manifest)
+    logger.info(f"Export {export_id} completed: {items} items in {seconds:.1f}s")
+    return manifest
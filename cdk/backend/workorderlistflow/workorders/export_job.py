@@ -0,0 +1,29 @@
+import os
+from aws_lambda_powertools import Logger
+from export import export_table
+
+
+WorkOrderTableName = os.getenv("WorkOrderTableName")
+DataBucketName = os.getenv("DataBucketName")
+EXPORT_SEGMENTS = int(os.getenv("EXPORT_SEGMENTS", "8"))
+EXPORT_MAX_WORKERS = int(os.getenv("EXPORT_MAX_WORKERS", "8"))
+
+# Initialize Powertools utilities
+POWERTOOLS_SERVICE_NAME = os.getenv("POWERTOOLS_SERVICE_NAME")
+logger = Logger(service=POWERTOOLS_SERVICE_NAME)
+
+
+@logger.inject_lambda_context
+def lambda_handler(event, context):
+    """
+    Runs one export started by the work order API, invoked asynchronously with
+    {"export_id": ..., "segments": ...}. Kept out of the API function so its
+    long timeout does not apply to API requests.
+    """
+    return export_table(
+        WorkOrderTableName,
+        DataBucketName,
+        event['export_id'],
+        int(event.get('segments') or EXPORT_SEGMENTS),
+        EXPORT_MAX_WORKERS
+    )
@@ -0,0 +1,130 @@
+import time
+import threading
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+# Item in the Locations table whose 'version' the data import bumps on every load
+LOCATIONS_META_KEY = '__meta__'
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_ATTEMPTS = 5
+
+
+def projection_kwargs(attributes) -> dict:
+    """
+    ProjectionExpression arguments for a list of attribute names, or {} for all
+    attributes. Names are aliased (#f0, #f1, ...) because several, such as
+    status, are DynamoDB reserved words.
+    """
+    if not attributes:
+        return {}
+    names = {f"#f{i}": attribute for i, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ", ".join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+
+class LocationCache:
+    """
+    Warm-container cache of Locations items keyed by location_name.
+
+    Entries live for ttl_seconds. At most every version_check_seconds the
+    table's meta item is read and the whole cache is dropped if its version has
+    changed, so imports are picked up without waiting for the TTL. Names not in
+    the cache are fetched with BatchGetItem; names with no item are cached as
+    missing too, so a warm container usually serves the join with no reads.
+
+    Reads can ask for a subset of attributes. Entries remember which attributes
+    they were fetched with and only serve requests they cover; full items serve
+    every request and are trimmed to the requested attributes.
+    """
+
+    def __init__(self, dynamodb, table, ttl_seconds: int, version_check_seconds: int):
+        self._dynamodb = dynamodb
+        self._table = table
+        self._ttl_seconds = ttl_seconds
+        self._version_check_seconds = version_check_seconds
+        self._entries = {}  # location_name -> (expires_at, item or None, attributes or None for all)
+        self._version = None
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _check_version(self, now: float):
+        if now - self._version_checked_at < self._version_check_seconds:
+            return
+        self._version_checked_at = now
+        try:
+            item = self._table.get_item(Key={'location_name': LOCATIONS_META_KEY}).get('Item') or {}
+        except Exception as e:
+            logger.error(f"Error reading locations version: {str(e)}")
+            return
+        version = item.get('version')
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"Locations version changed to {version}, clearing {len(self._entries)} cached locations")
+            self._entries.clear()
+            self._version = version
+
+    def _batch_get(self, names: list, attributes=None) -> dict:
+        table_name = self._table.name
+        found = {}
+        for start in range(0, len(names), BATCH_GET_MAX_KEYS):
+            request = {table_name: {
+                'Keys': [{'location_name': name} for name in names[start:start + BATCH_GET_MAX_KEYS]],
+                **projection_kwargs(attributes),
+            }}
+            for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                response = self._dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(table_name, []):
+                    found[item['location_name']] = item
+                request = response.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+                # Back off before retrying keys DynamoDB could not serve
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+            else:
+                unprocessed = len(request.get(table_name, {}).get('Keys', []))
+                raise RuntimeError(f"{unprocessed} location keys still unprocessed after {BATCH_GET_MAX_ATTEMPTS} attempts")
+        return found
+
+    @staticmethod
+    def _covers(entry_attributes, attributes) -> bool:
+        if entry_attributes is None:
+            return True
+        return attributes is not None and set(attributes) <= entry_attributes
+
+    @staticmethod
+    def _trim(item, attributes):
+        if item is None or attributes is None:
+            return item
+        return {key: value for key, value in item.items() if key in attributes}
+
+    def get_many(self, names, attributes=None) -> dict:
+        """
+        Return {location_name: item or None} for the given names, with only the
+        given attributes (location_name must be among them) or all attributes.
+        """
+        wanted = {name for name in names if name}
+        now = time.time()
+        result = {}
+        with self._lock:
+            self._check_version(now)
+            missing = []
+            for name in wanted:
+                entry = self._entries.get(name)
+                if entry and entry[0] > now and (entry[1] is None or self._covers(entry[2], attributes)):
+                    result[name] = self._trim(entry[1], attributes)
+                else:
+                    missing.append(name)
+
+        if missing:
+            fetched = self._batch_get(sorted(missing), attributes)
+            logger.info(f"Location cache: {len(result)} hits, {len(missing)} fetched")
+            entry_attributes = frozenset(attributes) if attributes is not None else None
+            with self._lock:
+                for name in missing:
+                    item = fetched.get(name)
+                    self._entries[name] = (now + self._ttl_seconds, item, entry_attributes)
+                    result[name] = item
+        return result
@@ -1,9 +1,18 @@
 import boto3
 import json
 import os
+import base64
+import uuid
+import gzip
+import hashlib
 from datetime import datetime, timezone
+from boto3.dynamodb.conditions import Key, Attr
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
+from briefing_history import BriefingHistory
+from location_cache import LocationCache, projection_kwargs
+from export import manifest_key, read_manifest, write_manifest, running_manifest
+from geohash import covering_cells_within, haversine_km, CELL_PRECISION
 
 
 
@@ -13,6 +22,84 @@ WorkOrderTableName = os.getenv("WorkOrderTableName")
 LocationTableName = os.getenv("LocationTableName")
 work_orders_table = dynamodb.Table(WorkOrderTableName)
 locations_table = dynamodb.Table(LocationTableName)
+BriefingsTableName = os.getenv("BriefingsTableName")
+briefings_table = dynamodb.Table(BriefingsTableName) if BriefingsTableName else None
+s3_client = boto3.client('s3')
+# Locations referenced by work orders, cached across warm invocations
+LOCATION_CACHE_TTL_SECONDS = int(os.getenv("LOCATION_CACHE_TTL_SECONDS", "900"))
+LOCATION_VERSION_CHECK_SECONDS = int(os.getenv("LOCATION_VERSION_CHECK_SECONDS", "60"))
+location_cache = LocationCache(dynamodb, locations_table, LOCATION_CACHE_TTL_SECONDS, LOCATION_VERSION_CHECK_SECONDS)
+# Bulk exports run asynchronously and are written to the data bucket
+DataBucketName = os.getenv("DataBucketName")
+EXPORT_SEGMENTS = int(os.getenv("EXPORT_SEGMENTS", "8"))
+MAX_EXPORT_SEGMENTS = 64
+# Exports run in their own function, see export_job.py
+ExportFunctionName = os.getenv("ExportFunctionName")
+lambda_client = boto3.client('lambda')
+BriefingHistoryTableName = os.getenv("BriefingHistoryTableName")
+briefing_history = BriefingHistory(dynamodb.Table(BriefingHistoryTableName)) if BriefingHistoryTableName else None
+# Per-technician daily worklists maintained from the table streams
+WorklistTableName = os.getenv("WorklistTableName")
+worklist_table = dynamodb.Table(WorklistTableName) if WorklistTableName else None
+
+# Heavy briefing attributes that are never returned by the list endpoint
+BRIEFING_ATTRIBUTES = ('safetyCheckResponse', 'safetyCheckResponseRef')
+# Attributes hasSafetyCheck is derived from
+BRIEFING_FLAG_ATTRIBUTES = ('hasSafetyCheck', 'safetyCheckPerformedAt') + BRIEFING_ATTRIBUTES
+BRIEFING_RESOURCE = "/workorders/{work_order_id}/briefing"
+BRIEFING_HISTORY_RESOURCE = "/workorders/{work_order_id}/briefing/history"
+NEAR_RESOURCE = "/workorders/near"
+MAX_HISTORY_VERSIONS = 20
+# Responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+# Page sizes for the cursor-paginated list
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# WorkOrders GSIs that serve the owner/status filters, both sorted by scheduled start
+OWNER_SCHEDULE_INDEX = "OwnerScheduleIndex"
+STATUS_SCHEDULE_INDEX = "StatusScheduleIndex"
+CURSOR_KEY_ATTRIBUTES = {'work_order_id', 'owner_name', 'status', 'scheduled_start_timestamp', 'sync_partition', 'updated_at'}
+# Named sparse fieldsets for the "fields" parameter: the work order and
+# location attributes to read (None reads everything)
+FIELD_PRESETS = {
+    'list': {
+        'work_orders': (
+            'work_order_id', 'description', 'status', 'priority', 'owner_name', 'location_name',
+            'scheduled_start_timestamp', 'scheduled_finish_timestamp',
+            'hasSafetyCheck', 'safetyCheckPerformedAt', 'updated_at', 'deleted',
+        ),
+        'locations': ('location_name', 'latitude', 'longitude'),
+    },
+    'map': {
+        'work_orders': (
+            'work_order_id', 'status', 'priority', 'location_name',
+            'scheduled_start_timestamp', 'hasSafetyCheck', 'safetyCheckPerformedAt',
+            'updated_at', 'deleted',
+        ),
+        'locations': ('location_name', 'latitude', 'longitude'),
+    },
+    'full': {
+        'work_orders': None,
+        'locations': None,
+    },
+}
+DEFAULT_FIELDS = 'full'
+# Sparse GSI of work orders by updated_at (epoch ms) for delta sync
+SYNC_INDEX = "SyncIndex"
+SYNC_PARTITION = "work_orders"
+# Re-send changes this far behind the watermark to cover writer clock skew;
+# clients apply items idempotently by work_order_id
+SYNC_OVERLAP_MS = int(os.getenv("SYNC_OVERLAP_MS", "5000"))
+# Locations by geohash cell, and work orders by location, for "near" queries
+GEOHASH_INDEX = "GeohashIndex"
+LOCATION_INDEX = "LocationIndex"
+DEFAULT_NEAR_RADIUS_KM = 15
+# Covered by 12 precision-4 cells up to 45 degrees of latitude and 20 at 70
+MAX_NEAR_RADIUS_KM = 25
+# GeohashIndex queries allowed per request. The finest covering within it is
+# used; a radius whose coarsest (precision-4) covering needs more cells, which
+# only happens near the poles, is rejected.
+MAX_COVER_CELLS = 32
 
 
 # Initialize Powertools utilities
@@ -23,6 +110,143 @@ metrics = Metrics(namespace="WorkOrderNamespace")
 
 
 
+def get_header(event, name):
+    """Case-insensitive request header lookup."""
+    headers = (event or {}).get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value covers the given strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as If-None-Match requires
+    return '*' in candidates or etag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+
+
+def accepts_gzip(event):
+    """
+    True if the client accepts gzip and API Gateway will pass the body through
+    as binary, which it only does when the first Accept media type is one of
+    the API's binary media types (application/json).
+    """
+    if 'gzip' not in (get_header(event, 'Accept-Encoding') or '').lower():
+        return False
+    accept = (get_header(event, 'Accept') or '').split(',')[0]
+    return accept.split(';')[0].strip().lower() == 'application/json'
+
+
+def build_response(status_code, body, event=None):
+    """
+    API Gateway proxy response with CORS headers.
+
+    When the request event is passed, successful responses carry a strong ETag
+    computed from the serialized body: a matching If-None-Match is answered
+    with an empty 304, and bodies of GZIP_MIN_BYTES or more are gzipped
+    (base64-encoded for API Gateway's binary passthrough) if the client sends
+    Accept-Encoding: gzip and Accept: application/json.
+    """
+    serialized = json.dumps(body, default=str, sort_keys=True)
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Credentials": True,
+    }
+    if event is None or status_code != 200:
+        return {
+            "statusCode": status_code,
+            "isBase64Encoded": False,
+            "headers": headers,
+            "body": serialized,
+        }
+
+    etag = '"' + hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:32] + '"'
+    headers["ETag"] = etag
+    headers["Access-Control-Expose-Headers"] = "ETag"
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if etag_matches(get_header(event, 'If-None-Match'), etag):
+        return {
+            "statusCode": 304,
+            "isBase64Encoded": False,
+            "headers": headers,
+            "body": "",
+        }
+
+    encoded = serialized.encode('utf-8')
+    if len(encoded) >= GZIP_MIN_BYTES and accepts_gzip(event):
+        headers["Content-Encoding"] = "gzip"
+        return {
+            "statusCode": 200,
+            "isBase64Encoded": True,
+            "headers": headers,
+            "body": base64.b64encode(gzip.compress(encoded, 6)).decode('ascii'),
+        }
+    return {
+        "statusCode": 200,
+        "isBase64Encoded": False,
+        "headers": headers,
+        "body": serialized,
+    }
+
+
+def summarize_briefing(order, attributes=None):
+    """
+    Replace stored briefing HTML on a work order with a summary flag.
+    attributes are the work order attributes that were read (None for all);
+    the flag is left out when none it is derived from were read.
+    """
+    if attributes is not None and not any(attr in attributes for attr in BRIEFING_FLAG_ATTRIBUTES):
+        return order
+    has_briefing = (
+        bool(order.get('hasSafetyCheck'))
+        or bool(order.get('safetyCheckPerformedAt'))
+        or any(order.get(attr) for attr in BRIEFING_ATTRIBUTES)
+    )
+    for attr in BRIEFING_ATTRIBUTES:
+        order.pop(attr, None)
+    order['hasSafetyCheck'] = has_briefing
+    return order
+
+
+def get_briefing(work_order_id):
+    """
+    Return the stored safety briefing for a work order, following an S3 pointer
+    for offloaded reports. Falls back to the WorkOrders item for briefings
+    written before the briefings table existed.
+    """
+    item = None
+    if briefings_table:
+        tracer.put_annotation("DynamoDBTable", "Briefings")
+        item = briefings_table.get_item(Key={'work_order_id': work_order_id}).get('Item')
+    if not item:
+        item = work_orders_table.get_item(
+            Key={'work_order_id': work_order_id},
+            ProjectionExpression="safetyCheckResponse, safetyCheckResponseRef, safetyCheckPerformedAt"
+        ).get('Item')
+    if not item:
+        return None
+
+    briefing = item.get('safetyCheckResponse')
+    ref = item.get('safetyCheckResponseRef')
+    if not briefing and ref:
+        response = s3_client.get_object(Bucket=ref['bucket'], Key=ref['key'])
+        briefing = response['Body'].read().decode('utf-8')
+    if not briefing:
+        return None
+
+    return {
+        'work_order_id': work_order_id,
+        'safetyCheckResponse': briefing,
+        'safetyCheckPerformedAt': item.get('safetyCheckPerformedAt'),
+        'safetyCheckDigest': item.get('safetyCheckDigest'),
+    }
+
+
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 @metrics.log_metrics(capture_cold_start_metric=True)
@@ -30,62 +254,477 @@ def lambda_handler(event, context):
     """
     Lambda function to query work orders and their associated locations from DynamoDB.
     """
+    if event.get('resource') == BRIEFING_RESOURCE:
+        return briefing_handler(event)
+    if event.get('resource') == BRIEFING_HISTORY_RESOURCE:
+        return briefing_history_handler(event)
+    if event.get('resource') == NEAR_RESOURCE:
+        return near_handler(event)
+    return list_handler(event)
+
+
+def briefing_handler(event):
+    """GET /workorders/{work_order_id}/briefing"""
+    try:
+        work_order_id = (event.get('pathParameters') or {}).get('work_order_id')
+        if not work_order_id:
+            return build_response(400, {'error': 'work_order_id is required'})
+
+        briefing = get_briefing(work_order_id)
+        if not briefing:
+            return build_response(404, {'error': f'No safety briefing found for {work_order_id}'})
+        return build_response(200, briefing, event)
+
+    except Exception as e:
+        logger.exception("Error retrieving safety briefing")
+        return build_response(500, {'error': str(e)})
+
+
+def briefing_history_handler(event):
+    """GET /workorders/{work_order_id}/briefing/history?limit=N | ?diff=true"""
     try:
-        # Define the current timestamp (UTC)
-        current_time = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
-        logger.info(f"Current time: {current_time}")
+        work_order_id = (event.get('pathParameters') or {}).get('work_order_id')
+        if not work_order_id:
+            return build_response(400, {'error': 'work_order_id is required'})
+        if not briefing_history:
+            return build_response(404, {'error': 'Briefing history is not enabled'})
+
+        params = event.get('queryStringParameters') or {}
+        tracer.put_annotation("DynamoDBTable", "BriefingHistory")
+        if str(params.get('diff', '')).lower() == 'true':
+            diff = briefing_history.diff_latest(work_order_id)
+            if not diff:
+                return build_response(404, {'error': f'No briefing history found for {work_order_id}'})
+            return build_response(200, diff, event)
+
+        try:
+            limit = int(params.get('limit', 1))
+        except ValueError:
+            return build_response(400, {'error': 'limit must be an integer'})
+        limit = max(1, min(limit, MAX_HISTORY_VERSIONS))
+        versions = briefing_history.latest(work_order_id, limit=limit)
+        return build_response(200, {'work_order_id': work_order_id, 'versions': versions}, event)
+
+    except Exception as e:
+        logger.exception("Error retrieving briefing history")
+        return build_response(500, {'error': str(e)})
+
 
-        # Scan work orders table
+def locations_near(latitude, longitude, radius_km):
+    """
+    Locations within radius_km of a point as [(distance_km, location)]. The
+    GeohashIndex is queried for each covering cell, then candidates are
+    refined by exact distance. Raises ValueError if the covering needs more
+    than MAX_COVER_CELLS queries.
+    """
+    cells = covering_cells_within(latitude, longitude, radius_km, MAX_COVER_CELLS)
+    if len(cells) > MAX_COVER_CELLS:
+        raise ValueError(f"radius_km is too large at this latitude, it would need {len(cells)} geohash cells")
+    tracer.put_annotation("DynamoDBIndex", GEOHASH_INDEX)
+    nearby = []
+    candidates = 0
+    for cell in cells:
+        key_condition = Key('geohash_cell').eq(cell[:CELL_PRECISION])
+        if len(cell) > CELL_PRECISION:
+            key_condition = key_condition & Key('geohash').begins_with(cell)
+        for location in read_all(locations_table.query, IndexName=GEOHASH_INDEX, KeyConditionExpression=key_condition):
+            candidates += 1
+            distance = haversine_km(latitude, longitude, float(location['latitude']), float(location['longitude']))
+            if distance <= radius_km:
+                nearby.append((distance, location))
+    logger.info(f"{len(cells)} geohash cells of precision {len(cells[0]) if cells else 0}: {candidates} candidates, {len(nearby)} locations within {radius_km} km")
+    return nearby
+
+
+def near_handler(event):
+    """
+    POST /workorders/near
+
+    {"latitude": ..., "longitude": ..., "radius_km": ...} returns the work
+    orders at locations within radius_km (default 15, at most 25), nearest
+    first, each with distance_km and location_details. Optional "from"/"to"
+    and "status" filter the work orders; "fields" picks a FIELD_PRESETS fieldset.
+    """
+    try:
+        body = parse_body(event)
+        try:
+            latitude = float(body['latitude'])
+            longitude = float(body['longitude'])
+            radius_km = float(body.get('radius_km') or DEFAULT_NEAR_RADIUS_KM)
+        except (KeyError, TypeError, ValueError):
+            return build_response(400, {'error': 'latitude and longitude are required and radius_km must be a number'})
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or radius_km <= 0:
+            return build_response(400, {'error': 'latitude, longitude or radius_km is out of range'})
+        radius_km = min(radius_km, MAX_NEAR_RADIUS_KM)
+        try:
+            fields = resolve_fields(body)
+        except ValueError as e:
+            return build_response(400, {'error': str(e)})
+
+        filters = schedule_condition(body.get('from'), body.get('to'), condition=Attr)
+        if body.get('status'):
+            status = Attr('status').eq(body['status'])
+            filters = status if filters is None else filters & status
+        location_attributes = fields['locations']
+
+        work_orders = []
         tracer.put_annotation("DynamoDBTable", "WorkOrders")
-        work_orders_response = work_orders_table.scan()
-        work_orders = work_orders_response.get('Items', [])
-        logger.info(f"Retrieved {len(work_orders)} work orders")
-
-        # Filter work orders based on the current date/time
-       # filtered_work_orders = [
-       #     order for order in work_orders 
-       #     if order['scheduled_start_timestamp'] >= current_time
-       # ]
-       # logger.info(f"Filtered {len(filtered_work_orders)} work orders")
-
-        # Query locations table to fetch location details
-        tracer.put_annotation("DynamoDBTable", "Locations")
-        locations_response = locations_table.scan()
-        locations = {loc['location_name']: loc for loc in locations_response.get('Items', [])}
-        logger.info(f"Retrieved {len(locations)} locations")
-
-        # Add location details to each work order
-        for order in work_orders:
-            location_name = order.get('location_name')
-            if location_name in locations:
-                order['location_details'] = locations[location_name]
-            else:
-                order['location_details'] = None  # Handle missing location details
-
-        # Record a metric for successful processing
-        #metrics.add_metric(name="SuccessfulWorkOrdersQuery", unit=MetricUnit.Count, value=1)
-        
-         # Sort work orders by 'work_order_id'
-        sorted_work_orders = sorted(work_orders, key=lambda x: x.get('work_order_id', ''))
-        # Return the work_orders with CORS headers
-        return {
-            "statusCode": 200,
-            "isBase64Encoded": False,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": True,
-            },
-            "body": json.dumps(sorted_work_orders),
-        }
+        try:
+            nearby = locations_near(latitude, longitude, radius_km)
+        except ValueError as e:
+            return build_response(400, {'error': str(e)})
+        for distance, location in nearby:
+            query_kwargs = {
+                'IndexName': LOCATION_INDEX,
+                'KeyConditionExpression': Key('location_name').eq(location['location_name']),
+                **projection_kwargs(fields['work_orders']),
+            }
+            if filters is not None:
+                query_kwargs['FilterExpression'] = filters
+            if location_attributes is not None:
+                location = {key: value for key, value in location.items() if key in location_attributes}
+            for order in read_all(work_orders_table.query, **query_kwargs):
+                if order.get('deleted'):
+                    continue
+                summarize_briefing(order, fields['work_orders'])
+                order['location_details'] = location
+                order['distance_km'] = round(distance, 3)
+                work_orders.append(order)
+
+        work_orders.sort(key=lambda x: (x['distance_km'], x.get('scheduled_start_timestamp', ''), x.get('work_order_id', '')))
+        logger.info(f"Found {len(work_orders)} work orders within {radius_km} km")
+        return build_response(200, {
+            'latitude': latitude,
+            'longitude': longitude,
+            'radius_km': radius_km,
+            'items': work_orders,
+        }, event)
 
     except Exception as e:
-        logger.exception("Error querying DynamoDB")
-        
-        # Record a metric for failed processing
-       # metrics.add_metric(name="FailedWorkOrdersQuery", unit=MetricUnit.Count, value=1)
+        logger.exception("Error querying work orders near a point")
+        return build_response(500, {'error': str(e)})
 
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+
+def parse_body(event):
+    """JSON request body as a dict; empty or missing bodies become {}."""
+    body = event.get('body')
+    if not body:
+        return {}
+    if event.get('isBase64Encoded'):
+        # application/json is a binary media type on this API, so bodies may arrive encoded
+        body = base64.b64decode(body).decode('utf-8')
+    parsed = json.loads(body)
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def encode_cursor(last_evaluated_key):
+    """Opaque pagination cursor for a DynamoDB LastEvaluatedKey."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """ExclusiveStartKey for a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('cursor is invalid')
+    if not isinstance(key, dict) or 'work_order_id' not in key or not set(key) <= CURSOR_KEY_ATTRIBUTES:
+        raise ValueError('cursor is invalid')
+    if 'updated_at' in key:
+        # SyncIndex sort key; encoded as a string like every other Decimal
+        try:
+            key['updated_at'] = int(key['updated_at'])
+        except (TypeError, ValueError):
+            raise ValueError('cursor is invalid')
+    return key
+
+
+def schedule_condition(date_from, date_to, condition=Key):
+    """Condition on scheduled_start_timestamp for an optional from/to window (Key or Attr)."""
+    if date_to and len(date_to) == 10:
+        # A bare date includes the whole day
+        date_to = f"{date_to}T23:59:59"
+    schedule = condition('scheduled_start_timestamp')
+    if date_from and date_to:
+        return schedule.between(date_from, date_to)
+    if date_from:
+        return schedule.gte(date_from)
+    if date_to:
+        return schedule.lte(date_to)
+    return None
+
+
+def build_read(body):
+    """
+    Choose how to read work orders for the filters in the request body.
+    owner and/or status route to a Query on the matching schedule index, with
+    from/to as a range on scheduled_start_timestamp; the results come back in
+    schedule order. Without owner or status the table is scanned, with any
+    from/to window applied as a filter. Returns (read function, kwargs, indexed).
+    """
+    owner = body.get('owner')
+    status = body.get('status')
+    date_from = body.get('from')
+    date_to = body.get('to')
+
+    if owner or status:
+        if owner:
+            index_name = OWNER_SCHEDULE_INDEX
+            key_condition = Key('owner_name').eq(owner)
+        else:
+            index_name = STATUS_SCHEDULE_INDEX
+            key_condition = Key('status').eq(status)
+        window = schedule_condition(date_from, date_to)
+        if window is not None:
+            key_condition = key_condition & window
+        read_kwargs = {'IndexName': index_name, 'KeyConditionExpression': key_condition}
+        if owner and status:
+            read_kwargs['FilterExpression'] = Attr('status').eq(status)
+        tracer.put_annotation("DynamoDBIndex", index_name)
+        return work_orders_table.query, read_kwargs, True
+
+    read_kwargs = {}
+    window = schedule_condition(date_from, date_to, condition=Attr)
+    if window is not None:
+        read_kwargs['FilterExpression'] = window
+    return work_orders_table.scan, read_kwargs, False
+
+
+def read_all(read, **read_kwargs):
+    """Run a scan or query to completion, following LastEvaluatedKey."""
+    items = []
+    while True:
+        response = read(**read_kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        read_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def resolve_fields(body):
+    """The FIELD_PRESETS entry named by the body's "fields". Raises ValueError if unknown."""
+    name = body.get('fields') or DEFAULT_FIELDS
+    if name not in FIELD_PRESETS:
+        raise ValueError(f"fields must be one of: {', '.join(FIELD_PRESETS)}")
+    return FIELD_PRESETS[name]
+
+
+def attach_locations(work_orders, location_attributes=None, work_order_attributes=None):
+    """
+    Summarize briefings and add location details to each work order.
+    work_order_attributes are the attributes the work orders were read with.
+    """
+    tracer.put_annotation("DynamoDBTable", "Locations")
+    locations = location_cache.get_many(
+        (order.get('location_name') for order in work_orders),
+        location_attributes
+    )
+    logger.info(f"Resolved {len(locations)} locations")
+
+    for order in work_orders:
+        summarize_briefing(order, work_order_attributes)
+        # None for missing location details
+        order['location_details'] = locations.get(order.get('location_name'))
+    return work_orders
+
+
+def start_export(body):
+    """Start an asynchronous parallel-scan export by invoking the export function."""
+    if not DataBucketName or not ExportFunctionName:
+        return build_response(400, {'error': 'Export is not enabled'})
+    try:
+        segments = int(body.get('segments') or EXPORT_SEGMENTS)
+    except (TypeError, ValueError):
+        return build_response(400, {'error': 'segments must be an integer'})
+    segments = max(1, min(segments, MAX_EXPORT_SEGMENTS))
+
+    started_at = datetime.now(timezone.utc)
+    export_id = f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+    # Written before the job starts so status polls right after the 202 find it
+    write_manifest(s3_client, DataBucketName, export_id, running_manifest(
+        export_id, WorkOrderTableName, segments, started_at.isoformat()
+    ))
+    lambda_client.invoke(
+        FunctionName=ExportFunctionName,
+        InvocationType='Event',
+        Payload=json.dumps({'export_id': export_id, 'segments': segments}).encode('utf-8')
+    )
+    logger.info(f"Started export {export_id} with {segments} segments")
+    return build_response(202, {
+        'export_id': export_id,
+        'status': 'STARTED',
+        'bucket': DataBucketName,
+        'manifest_key': manifest_key(export_id),
+    })
+
+
+def export_status(body):
+    """Manifest of an export started with mode "export"."""
+    export_id = body.get('export_id')
+    if not export_id or not DataBucketName:
+        return build_response(400, {'error': 'export_id is required'})
+    manifest = read_manifest(s3_client, DataBucketName, export_id)
+    if not manifest:
+        return build_response(404, {'error': f'No export found for {export_id}'})
+    return build_response(200, manifest)
+
+
+def sync_handler(body, event):
+    """
+    Work orders changed since the client's watermark, from the SyncIndex in
+    updated_at order, one page at a time: {"since": <ms>, "limit": ...,
+    "cursor": ...}. Clients keep the same "since" and follow next_cursor until
+    it is null; each page's watermark is the latest updated_at seen so far, so
+    the last page's is the one to sync from next time.
+
+    Work orders are deleted softly so that clients can be told: a writer sets
+    deleted = true along with updated_at and sync_partition, as for any other
+    change, and leaves the item in place. Those items are returned here as
+    tombstones and are left out of full lists.
+    """
+    try:
+        since = int(body['since'])
+    except (TypeError, ValueError):
+        return build_response(400, {'error': 'since must be an epoch timestamp in milliseconds'})
+    try:
+        fields = resolve_fields(body)
+        limit = int(body.get('limit') or DEFAULT_PAGE_SIZE)
+        read_kwargs = {'Limit': max(1, min(limit, MAX_PAGE_SIZE))}
+        if body.get('cursor'):
+            read_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+    except (TypeError, ValueError) as e:
+        return build_response(400, {'error': str(e)})
+
+    tracer.put_annotation("DynamoDBIndex", SYNC_INDEX)
+    response = work_orders_table.query(
+        IndexName=SYNC_INDEX,
+        KeyConditionExpression=Key('sync_partition').eq(SYNC_PARTITION) & Key('updated_at').gt(max(0, since - SYNC_OVERLAP_MS)),
+        **read_kwargs,
+        **projection_kwargs(fields['work_orders'])
+    )
+    changed = response.get('Items', [])
+    watermark = max([since] + [int(order['updated_at']) for order in changed])
+    tombstones = [
+        {'work_order_id': order['work_order_id'], 'updated_at': int(order['updated_at'])}
+        for order in changed if order.get('deleted')
+    ]
+    items = [order for order in changed if not order.get('deleted')]
+    logger.info(f"Delta sync since {since}: {len(items)} changed, {len(tombstones)} deleted")
+    attach_locations(items, fields['locations'], fields['work_orders'])
+    return build_response(200, {
+        'items': items,
+        'tombstones': tombstones,
+        'watermark': watermark,
+        'next_cursor': encode_cursor(response.get('LastEvaluatedKey')),
+    }, event)
+
+
+def worklist_handler(body, event):
+    """
+    One technician's work orders for one day, with location coordinates and
+    briefing status, from a single GetItem on the materialized worklist.
+    """
+    owner = body.get('owner')
+    date = body.get('date')
+    if not worklist_table:
+        return build_response(400, {'error': 'Worklists are not enabled'})
+    if not owner or not date:
+        return build_response(400, {'error': 'owner and date are required'})
+
+    tracer.put_annotation("DynamoDBTable", "Worklists")
+    item = worklist_table.get_item(Key={'worklist_key': f"worklist#{owner}#{str(date)[:10]}"}).get('Item') or {}
+    entries = sorted(
+        (item.get('work_orders') or {}).values(),
+        key=lambda x: (x.get('scheduled_start_timestamp', ''), x.get('work_order_id', ''))
+    )
+    logger.info(f"Worklist for {owner} on {date}: {len(entries)} work orders")
+    return build_response(200, {
+        'owner': owner,
+        'date': str(date)[:10],
+        'items': entries,
+        'updated_at': item.get('updated_at'),
+    }, event)
+
+
+def list_handler(event):
+    """
+    POST /workorders/
+
+    {"mode": "export"} starts a full export to the data bucket and returns 202;
+    {"mode": "export_status", "export_id": ...} returns its manifest.
+    {"mode": "worklist", "owner": ..., "date": "YYYY-MM-DD"} returns that
+    technician's materialized worklist, see worklist_handler.
+    {"since": <epoch ms>} returns only the changes since then, see sync_handler.
+    "fields" picks a FIELD_PRESETS fieldset: list, map or full (the default).
+
+    Optional filters in the body: "owner", "status", "from" and "to" (ISO
+    timestamps or dates on scheduled_start_timestamp). See build_read.
+
+    With no paging parameters every matching work order is returned as an
+    array. With "limit" and/or "cursor" one page is returned as
+    {"items": [...], "next_cursor": "..."}; next_cursor is null on the last
+    page. Filtered pages are in schedule order; unfiltered pages follow the
+    table's scan order, which is stable between requests but not sorted, so
+    clients sort the combined pages themselves.
+    """
+    try:
+        body = parse_body(event)
+        if body.get('mode') == 'export':
+            return start_export(body)
+        if body.get('mode') == 'export_status':
+            return export_status(body)
+        if body.get('mode') == 'worklist':
+            return worklist_handler(body, event)
+        if 'since' in body:
+            return sync_handler(body, event)
+        paginated = 'limit' in body or 'cursor' in body
+
+        tracer.put_annotation("DynamoDBTable", "WorkOrders")
+        read, read_kwargs, indexed = build_read(body)
+        try:
+            fields = resolve_fields(body)
+        except ValueError as e:
+            return build_response(400, {'error': str(e)})
+        # Only the requested attributes are read and returned
+        read_kwargs.update(projection_kwargs(fields['work_orders']))
+
+        def live(work_orders):
+            # Soft-deleted work orders only appear as delta sync tombstones
+            return [order for order in work_orders if not order.get('deleted')]
+
+        if not paginated:
+            work_orders = read_all(read, **read_kwargs)
+            logger.info(f"Retrieved {len(work_orders)} work orders")
+            attach_locations(work_orders, fields['locations'], fields['work_orders'])
+            work_orders = live(work_orders)
+            # Index queries are already in schedule order
+            if not indexed:
+                work_orders.sort(key=lambda x: x.get('work_order_id', ''))
+            return build_response(200, work_orders, event)
+
+        try:
+            limit = int(body.get('limit') or DEFAULT_PAGE_SIZE)
+            read_kwargs['Limit'] = max(1, min(limit, MAX_PAGE_SIZE))
+            if body.get('cursor'):
+                read_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+        except (TypeError, ValueError) as e:
+            return build_response(400, {'error': str(e)})
+
+        response = read(**read_kwargs)
+        work_orders = response.get('Items', [])
+        logger.info(f"Retrieved page of {len(work_orders)} work orders")
+        attach_locations(work_orders, fields['locations'], fields['work_orders'])
+
+        return build_response(200, {
+            # Unfiltered pages stay in scan order: sorting within a page would not
+            # order the joined list, so clients sort the pages they combine
+            'items': live(work_orders),
+            'next_cursor': encode_cursor(response.get('LastEvaluatedKey')),
+        }, event)
+
+    except Exception as e:
+        logger.exception("Error querying DynamoDB")
+        return build_response(500, {'error': str(e)})
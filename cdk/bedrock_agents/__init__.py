@@ -17,6 +17,8 @@ from aws_cdk import (
 from constructs import Construct
 from cdk_nag import NagSuppressions, NagPackSuppression
 
+import core_constructs as core
+
 
 class BedrockAgentsStack(NestedStack):
     """Nested stack for Bedrock Agents functionality"""
@@ -74,12 +76,16 @@ class BedrockAgentsStack(NestedStack):
             ]
         )
 
-        # Deploy CSV files from local data directory to S3 bucket
+        # Deploy CSV files from local data directory to S3 bucket. The bucket also
+        # holds objects written at runtime (offloaded briefings under briefings/,
+        # work order exports under exports/work_orders/), so a redeploy must not
+        # delete what is not in the asset
         data_deployment = s3deploy.BucketDeployment(
              self,
              "DeployCSVFiles",
              sources=[s3deploy.Source.asset("../data", exclude=["**/*", "!**/*.csv"])],
              destination_bucket=data_bucket,
+             prune=False,
              log_retention=logs.RetentionDays.ONE_WEEK,
              memory_limit=512
         )
@@ -107,6 +113,8 @@ class BedrockAgentsStack(NestedStack):
                 type=dynamodb.AttributeType.STRING
             ),
             removal_policy=RemovalPolicy.DESTROY,
+            # Feeds the backend's materialized worklists
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
         )
         
         work_orders_table.add_global_secondary_index(
@@ -118,6 +126,35 @@ class BedrockAgentsStack(NestedStack):
             projection_type=dynamodb.ProjectionType.ALL
         )
 
+        # Indexes added after the original LocationIndex, in the order they were
+        # introduced: a technician's or a status's work orders in schedule order,
+        # and a sparse index of work orders by last change for delta sync (writers
+        # set sync_partition and updated_at in epoch ms on every change).
+        # DynamoDB creates at most one GSI per table update, so a fresh stack gets
+        # them all at once, but an existing stack must be upgraded one deployment
+        # per index with -c work_orders_index_stage=1, 2 and then 3. See README.
+        staged_indexes = [
+            ("OwnerScheduleIndex", "owner_name", "scheduled_start_timestamp", dynamodb.AttributeType.STRING),
+            ("StatusScheduleIndex", "status", "scheduled_start_timestamp", dynamodb.AttributeType.STRING),
+            ("SyncIndex", "sync_partition", "updated_at", dynamodb.AttributeType.NUMBER),
+        ]
+        index_stage = self.node.try_get_context("work_orders_index_stage")
+        if index_stage is not None:
+            staged_indexes = staged_indexes[:int(index_stage)]
+        for index_name, partition_key, sort_key, sort_key_type in staged_indexes:
+            work_orders_table.add_global_secondary_index(
+                index_name=index_name,
+                partition_key=dynamodb.Attribute(
+                    name=partition_key,
+                    type=dynamodb.AttributeType.STRING
+                ),
+                sort_key=dynamodb.Attribute(
+                    name=sort_key,
+                    type=sort_key_type
+                ),
+                projection_type=dynamodb.ProjectionType.ALL
+            )
+
         locations_table = dynamodb.Table(
             self,
             "LocationsTable",
@@ -128,6 +165,24 @@ class BedrockAgentsStack(NestedStack):
                 type=dynamodb.AttributeType.STRING
             ),
             removal_policy=RemovalPolicy.DESTROY,
+            # Feeds the backend's materialized worklists
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+        )
+
+        # Spatial access path: locations by geohash cell (prefix of geohash), with
+        # the full geohash as sort key so finer cells are begins_with ranges.
+        # Sparse; the data import sets both attributes from latitude/longitude.
+        locations_table.add_global_secondary_index(
+            index_name="GeohashIndex",
+            partition_key=dynamodb.Attribute(
+                name="geohash_cell",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="geohash",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.ALL
         )
 
         hazards_table = dynamodb.Table(
@@ -333,6 +388,9 @@ class BedrockAgentsStack(NestedStack):
         function_name = f"{construct_id.lower()}-data-import"
         
         
+        # geohash and emergency_feed come from the shared code layer, as for the backend functions
+        shared_code_layer = core.CoreSharedCodeLayer(self, "DataImportSharedCode")
+
         # Create Data Import Lambda Function
         data_import_function = lambda_.Function(
             self,
@@ -341,6 +399,7 @@ class BedrockAgentsStack(NestedStack):
             runtime=lambda_.Runtime.PYTHON_3_13,  # Updated to latest Python runtime
             handler="index.handler",
             code=lambda_.Code.from_asset("./bedrock_agents/data_import"),
+            layers=[shared_code_layer],
             role=lambda_execution_role,
             timeout=Duration.seconds(300),
             memory_size=256,
@@ -480,6 +539,7 @@ class BedrockAgentsStack(NestedStack):
             runtime=lambda_.Runtime.PYTHON_3_13,  # Updated to latest Python runtime
             handler="index.lambda_handler",
             code=lambda_.Code.from_asset("./bedrock_agents/emergency_alert"),
+            layers=[shared_code_layer],
             role=lambda_execution_role,
             timeout=Duration.seconds(30),
             memory_size=256,
@@ -1113,6 +1173,9 @@ You must format your final report using this exact HTML structure:
         # Store references to resources for outputs
         self.work_orders_table_name = work_orders_table.table_name
         self.locations_table_name = locations_table.table_name
+        self.work_orders_table_stream_arn = work_orders_table.table_stream_arn
+        self.locations_table_stream_arn = locations_table.table_stream_arn
+        self.data_bucket_name = data_bucket.bucket_name
         self.supervisor_agent_id = supervisor_agent.attr_agent_id
         self.supervisor_agent_alias_id = supervisor_agent_alias.attr_agent_alias_id
 
@@ -3,8 +3,10 @@ import csv
 import json
 import os
 import io
+import uuid
 from datetime import datetime, timedelta
 import cfnresponse
+from geohash import encode as geohash_encode, CELL_PRECISION
 
 dynamodb = boto3.resource('dynamodb')
 
@@ -68,11 +70,39 @@ def update_work_order_dates(items):
     
     return items
 
+def stamp_sync_attributes(items):
+    """Mark imported work orders as changed for delta sync (see SyncIndex)."""
+    updated_at = int(datetime.now().timestamp() * 1000)
+    for item in items:
+        item['updated_at'] = updated_at
+        item['sync_partition'] = 'work_orders'
+    return items
+
+def stamp_geohash(items):
+    """Add geohash and geohash_cell (see GeohashIndex) to locations with coordinates."""
+    for item in items:
+        try:
+            latitude = float(item['latitude'])
+            longitude = float(item['longitude'])
+        except (KeyError, TypeError, ValueError):
+            print(f"Location {item.get('location_name')} has no valid coordinates, not indexed")
+            continue
+        geohash = geohash_encode(latitude, longitude)
+        item['geohash'] = geohash
+        item['geohash_cell'] = geohash[:CELL_PRECISION]
+    return items
+
 def batch_write_items(table, items):
     with table.batch_writer() as batch:
         for item in items:
             batch.put_item(Item=item)
 
+def stamp_locations_version(table):
+    """Bump the version on the Locations meta item so cached locations are reloaded."""
+    version = f"{datetime.now().isoformat()}#{uuid.uuid4().hex[:8]}"
+    table.put_item(Item={'location_name': '__meta__', 'version': version})
+    print(f"Locations version set to {version}")
+
 def handler(event, context):
     try:
         # Check if this is a CloudFormation custom resource request
@@ -109,10 +139,15 @@ def handler(event, context):
                 # Update work order dates if this is the work_orders table
                 if table_name == 'work_orders':
                     items = update_work_order_dates(items)
+                    items = stamp_sync_attributes(items)
+                if table_name == 'locations':
+                    items = stamp_geohash(items)
                     
                 table = get_table(table_name.upper())
                 batch_write_items(table, items)
                 results[table_name] = len(items)
+                if table_name == 'locations':
+                    stamp_locations_version(table)
         
         response_data = {
             'message': 'Data import completed successfully',
@@ -1,9 +1,9 @@
 import json
-import urllib3
 import math
 import logging
 import os
 from datetime import datetime, timedelta
+from emergency_feed import EmergencyFeed, DEFAULT_FEED_URL
 
 log_level = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
 logging.basicConfig(
@@ -12,6 +12,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.setLevel(log_level)
 
+# Parsed feed shared across warm invocations, see EmergencyFeed
+emergency_feed = EmergencyFeed(
+    url=os.environ.get("EMERGENCY_FEED_URL", DEFAULT_FEED_URL),
+    ttl_seconds=int(os.environ.get("EMERGENCY_FEED_TTL_SECONDS", "60")),
+    max_stale_seconds=int(os.environ.get("EMERGENCY_FEED_MAX_STALE_SECONDS", "3600")),
+    connect_timeout=float(os.environ.get("EMERGENCY_FEED_CONNECT_TIMEOUT_SECONDS", "3")),
+    read_timeout=float(os.environ.get("EMERGENCY_FEED_READ_TIMEOUT_SECONDS", "10")),
+)
+
 FUNCTION_NAMES = []
 
 try:
@@ -24,14 +33,9 @@ except Exception as e:
 def emvalert(lat, long):
     search_point = (long, lat)
 
-    # Download the GeoJSON data
-    http = urllib3.PoolManager()
-    response = http.request('GET', 'https://emergency.vic.gov.au/public/events-geojson.json')
-    geojson_data = json.loads(response.data.decode('utf-8'))
-    
     relevant_incidents = []
     
-    for feature in geojson_data['features']:
+    for feature in emergency_feed.features():
         geometry = feature['geometry']
         
         if geometry['type'] == 'GeometryCollection':
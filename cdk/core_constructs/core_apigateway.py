@@ -25,6 +25,7 @@ class CoreApiGateway(Construct):
             construct_id: str,
             region: str,
             user_pool: cognito.UserPool,
+            binary_media_types: typing.Optional[typing.Sequence[str]] = None,
             **kwargs,
     ):
         super().__init__(scope, construct_id, **kwargs)
@@ -43,9 +44,10 @@ class CoreApiGateway(Construct):
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=apigateway.Cors.ALL_ORIGINS,
                 allow_methods=apigateway.Cors.ALL_METHODS,
-                allow_headers=apigateway.Cors.DEFAULT_HEADERS,
+                allow_headers=[*apigateway.Cors.DEFAULT_HEADERS, "If-None-Match"],
             ),
-            binary_media_types=["application/pdf", "text/plain"],
+            # Extra types let proxy Lambdas return base64 bodies (e.g. gzip) as binary
+            binary_media_types=["application/pdf", "text/plain", *(binary_media_types or [])],
             deploy_options=apigateway.StageOptions(
                 logging_level=apigateway.MethodLoggingLevel.OFF,
                 tracing_enabled=True,
@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
+import os
+
 from aws_cdk import (
     aws_lambda_python_alpha as lambda_python,
     aws_lambda as lambda_,
@@ -11,6 +13,29 @@ from constructs import Construct
 from cdk_nag import NagSuppressions, NagPackSuppression
 
 
+# Modules used by more than one function asset live once, under python/ here
+SHARED_CODE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lambda_shared")
+
+
+class CoreSharedCodeLayer(lambda_.LayerVersion):
+    """Layer with the shared Python modules, importable by name from /opt/python."""
+
+    def __init__(
+            self,
+            scope: Construct,
+            construct_id: str,
+            **kwargs,
+    ):
+        super().__init__(
+            scope,
+            construct_id,
+            code=lambda_.Code.from_asset(SHARED_CODE_PATH),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_13],
+            description="Python modules shared between function assets",
+            **kwargs,
+        )
+
+
 class CorePythonFunction(lambda_python.PythonFunction):
 
     def __init__(
@@ -0,0 +1,113 @@
+import zlib
+import difflib
+import hashlib
+from boto3.dynamodb.conditions import Key
+from aws_lambda_powertools import Logger
+
+logger = Logger(child=True)
+
+# DynamoDB items are capped at 400KB; leave room for the other attributes
+MAX_COMPRESSED_BYTES = 380000
+
+
+def _digest(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+def _decompress(value) -> str:
+    # boto3 returns Binary attributes wrapped in boto3.dynamodb.types.Binary
+    raw = getattr(value, 'value', value)
+    return zlib.decompress(bytes(raw)).decode('utf-8')
+
+
+class BriefingHistory:
+    """
+    Append-only safety briefing history keyed by work_order_id (partition) and
+    created_at (sort, ISO timestamp). Each version stores the zlib-compressed
+    HTML with its SHA-256 digest; a version identical to the latest one is not
+    written again.
+    """
+
+    def __init__(self, table):
+        self._table = table
+
+    def latest_digest(self, work_order_id: str):
+        items = self._table.query(
+            KeyConditionExpression=Key('work_order_id').eq(work_order_id),
+            ProjectionExpression="digest",
+            ScanIndexForward=False,
+            Limit=1
+        ).get('Items', [])
+        return items[0]['digest'] if items else None
+
+    def append(self, work_order_id: str, html: str, created_at: str, digest: str = None) -> bool:
+        """Store a new version. Returns False if it matched the latest version or was too large."""
+        digest = digest or _digest(html)
+        if self.latest_digest(work_order_id) == digest:
+            logger.info(f"Briefing for {work_order_id} unchanged, skipping history write")
+            return False
+
+        body = html.encode('utf-8')
+        compressed = zlib.compress(body, 9)
+        if len(compressed) > MAX_COMPRESSED_BYTES:
+            logger.warning(f"Compressed briefing for {work_order_id} is {len(compressed)} bytes, not kept in history")
+            return False
+
+        self._table.put_item(
+            Item={
+                'work_order_id': work_order_id,
+                'created_at': created_at,
+                'digest': digest,
+                'size': len(body),
+                'compressed_size': len(compressed),
+                'html_z': compressed,
+            },
+            # Two runs finishing in the same instant must not overwrite each other
+            ConditionExpression="attribute_not_exists(created_at)"
+        )
+        logger.info(f"Stored briefing version {created_at} for {work_order_id} ({len(body)} -> {len(compressed)} bytes)")
+        return True
+
+    def latest(self, work_order_id: str, limit: int = 1, include_html: bool = True) -> list:
+        """The newest versions first, decompressed when include_html is set."""
+        query_kwargs = {
+            'KeyConditionExpression': Key('work_order_id').eq(work_order_id),
+            'ScanIndexForward': False,
+            'Limit': limit,
+        }
+        if not include_html:
+            query_kwargs['ProjectionExpression'] = "work_order_id, created_at, digest, #size, compressed_size"
+            query_kwargs['ExpressionAttributeNames'] = {'#size': 'size'}
+        versions = []
+        for item in self._table.query(**query_kwargs).get('Items', []):
+            version = {
+                'created_at': item['created_at'],
+                'digest': item['digest'],
+                'size': int(item.get('size', 0)),
+                'compressed_size': int(item.get('compressed_size', 0)),
+            }
+            if include_html:
+                version['html'] = _decompress(item['html_z'])
+            versions.append(version)
+        return versions
+
+    def diff_latest(self, work_order_id: str):
+        """Unified diff of the latest version against the one before it."""
+        versions = self.latest(work_order_id, limit=2)
+        if not versions:
+            return None
+        current = versions[0]
+        previous = versions[1] if len(versions) > 1 else None
+        previous_lines = previous['html'].splitlines(keepends=True) if previous else []
+        diff = ''.join(difflib.unified_diff(
+            previous_lines,
+            current['html'].splitlines(keepends=True),
+            fromfile=previous['created_at'] if previous else 'empty',
+            tofile=current['created_at']
+        ))
+        return {
+            'work_order_id': work_order_id,
+            'current': {k: v for k, v in current.items() if k != 'html'},
+            'previous': {k: v for k, v in previous.items() if k != 'html'} if previous else None,
+            'diff': diff,
+        }
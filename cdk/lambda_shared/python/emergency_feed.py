@@ -0,0 +1,79 @@
+import json
+import time
+import logging
+import threading
+import urllib3
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEED_URL = "https://emergency.vic.gov.au/public/events-geojson.json"
+
+
+class EmergencyFeed:
+    """
+    Warm-container client for the emergency events GeoJSON feed.
+
+    The parsed feed is kept as a snapshot and served without any request for
+    ttl_seconds. After that it is revalidated with If-None-Match /
+    If-Modified-Since; a 304 keeps the snapshot. If the origin fails or times
+    out, a snapshot up to max_stale_seconds old is served instead and the next
+    attempt waits retry_seconds, so an outage does not add a timeout to every
+    call.
+    """
+
+    def __init__(self, url: str = DEFAULT_FEED_URL, ttl_seconds: float = 60, max_stale_seconds: float = 3600,
+                 retry_seconds: float = 15, connect_timeout: float = 3.0, read_timeout: float = 10.0):
+        self._url = url
+        self._ttl_seconds = ttl_seconds
+        self._max_stale_seconds = max_stale_seconds
+        self._retry_seconds = retry_seconds
+        self._http = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+            retries=urllib3.Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+        )
+        self._snapshot = None
+        self._etag = None
+        self._last_modified = None
+        self._validated_at = 0.0
+        self._next_check_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fetch(self, now: float):
+        headers = {'Accept-Encoding': 'gzip'}
+        if self._snapshot is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        response = self._http.request('GET', self._url, headers=headers)
+
+        if response.status == 304 and self._snapshot is not None:
+            logger.info("Emergency feed not modified, keeping snapshot")
+        elif response.status == 200:
+            self._snapshot = json.loads(response.data.decode('utf-8'))
+            self._etag = response.headers.get('ETag')
+            self._last_modified = response.headers.get('Last-Modified')
+            logger.info(f"Emergency feed downloaded: {len(response.data)} bytes, {len(self._snapshot.get('features', []))} features")
+        else:
+            raise RuntimeError(f"Emergency feed returned HTTP {response.status}")
+        self._validated_at = now
+        self._next_check_at = now + self._ttl_seconds
+
+    def get(self) -> dict:
+        """The parsed feed. Raises if it cannot be fetched and no usable snapshot exists."""
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is not None and now < self._next_check_at:
+                return self._snapshot
+            try:
+                self._fetch(now)
+            except Exception as e:
+                age = now - self._validated_at
+                if self._snapshot is None or age > self._max_stale_seconds:
+                    raise
+                logger.warning(f"Error refreshing emergency feed, serving snapshot {age:.0f}s old: {str(e)}")
+                self._next_check_at = now + self._retry_seconds
+            return self._snapshot
+
+    def features(self) -> list:
+        return self.get().get('features', [])
@@ -0,0 +1,107 @@
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+# Locations are stored with a full geohash and its cell prefix, which is the
+# GeohashIndex partition key; finer cells are begins_with ranges on the geohash
+GEOHASH_PRECISION = 9
+CELL_PRECISION = 4
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash of a point, interleaving longitude and latitude bits."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision: int):
+    """(height, width) in degrees of a geohash cell at the given precision."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float):
+    """
+    (min_lat, min_lon, max_lat, max_lon) enclosing a circle. Longitudes are
+    not wrapped: near the antimeridian min_lon < -180 or max_lon > 180.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    d_lon = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+    if d_lon >= 180.0:
+        min_lon, max_lon = -180.0, 180.0
+    else:
+        min_lon, max_lon = longitude - d_lon, longitude + d_lon
+    return (
+        max(-90.0, latitude - d_lat),
+        min_lon,
+        min(90.0, latitude + d_lat),
+        max_lon,
+    )
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float, precision: int) -> list:
+    """Geohash cells at the given precision that together cover the circle's bounding box."""
+    min_lat, min_lon, max_lat, max_lon = bounding_box(latitude, longitude, radius_km)
+    height, width = cell_size(precision)
+    columns = round(360.0 / width)
+    cells = set()
+    row = math.floor((min_lat + 90.0) / height)
+    while row * height - 90.0 <= max_lat and row * height < 180.0:
+        # Encode each cell's centre so points on cell edges land in the right one
+        cell_lat = row * height - 90.0 + height / 2
+        first_column = math.floor((min_lon + 180.0) / width)
+        column = first_column
+        while column * width - 180.0 <= max_lon and column < first_column + columns:
+            # Columns past either side of the antimeridian wrap round to the other
+            cells.add(encode(cell_lat, (column % columns) * width - 180.0 + width / 2, precision))
+            column += 1
+        row += 1
+    return sorted(cells)
+
+
+def covering_cells_within(latitude: float, longitude: float, radius_km: float, max_cells: int,
+                          min_precision: int = CELL_PRECISION, max_precision: int = GEOHASH_PRECISION) -> list:
+    """
+    The finest covering (fewest false positives) with at most max_cells cells,
+    never coarser than min_precision. The min_precision covering is returned
+    even when it has more than max_cells cells, so callers must check.
+    """
+    cells = covering_cells(latitude, longitude, radius_km, min_precision)
+    for precision in range(min_precision + 1, max_precision + 1):
+        finer = covering_cells(latitude, longitude, radius_km, precision)
+        if len(finer) > max_cells:
+            break
+        cells = finer
+    return cells
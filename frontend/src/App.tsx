@@ -4,7 +4,7 @@ import '@aws-amplify/ui-react/styles.css';
 
 import WorkOrderDetails from '@components/WorkOrderDetails';
 import { useEffect, useState } from 'react';
-import { WorkOrder, postWorkOrderQuery } from '@lib/api';
+import { WorkOrder, refreshWorkOrders, sortWorkOrders } from '@lib/api';
 import "@cloudscape-design/global-styles/index.css";
 
 import {
@@ -47,7 +47,13 @@ const WorkOrderList = () => {
     const fetchWorkOrders = async (attempt: number = 1) => {
       try {
         setLoading(true);
-        const data = await postWorkOrderQuery();
+        setWorkOrders([]);
+        // The first load renders each page as it arrives; later loads (returning
+        // to the list) only fetch the changes since then
+        const data = await refreshWorkOrders(items => {
+          setWorkOrders(prev => sortWorkOrders([...prev, ...items]));
+          setLoading(false);
+        });
         setWorkOrders(data);
         setError(null);
       } catch (err) {
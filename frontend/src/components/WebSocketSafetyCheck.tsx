@@ -21,9 +21,15 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
   const [isProcessing, setIsProcessing] = useState(false);
   const [traceContent, setTraceContent] = useState<string>("");
   const [currentChunk, setCurrentChunk] = useState<string>("");
+  const [sections, setSections] = useState<string[]>([]);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [authError, setAuthError] = useState<string | null>(null);
   const [finalResponseReceived, setFinalResponseReceived] = useState(false);
+  // The last briefing was replayed from the server's cache rather than a fresh agent run
+  const [servedFromCache, setServedFromCache] = useState(false);
   const timeoutRef = useRef<NodeJS.Timeout | null>(null);
+  // Id of the in-flight check, reported by the server so it can be cancelled
+  const requestIdRef = useRef<string | null>(null);
 
   useEffect(() => {
     const handleMessage = (message: WebSocketMessage) => {
@@ -35,20 +41,55 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
 
       switch (messageType) {
         case 'chunk':
+          setQueuePosition(null);
           if (webSocketMessage.content) {
             setCurrentChunk(prev => prev + webSocketMessage.content);
           }
           break;
+        case 'status':
+          // SUBSCRIBED carries the id of the run this check joined, which is what it cancels
+          if (webSocketMessage.requestId && ['STARTED', 'QUEUED', 'SUBSCRIBED'].includes(webSocketMessage.status ?? '')) {
+            requestIdRef.current = webSocketMessage.requestId;
+          }
+          if (webSocketMessage.status === 'STARTED') {
+            setQueuePosition(null);
+          }
+          break;
+        case 'queued':
+          // Waiting for a free agent slot
+          if (webSocketMessage.requestId) {
+            requestIdRef.current = webSocketMessage.requestId;
+          }
+          setQueuePosition(webSocketMessage.position ?? null);
+          break;
+        case 'section':
+          // A completed report section, rendered before the full briefing arrives
+          if (webSocketMessage.html) {
+            setSections(prev => [...prev, webSocketMessage.html]);
+          }
+          break;
         case 'trace':
           // Process trace message
+          setQueuePosition(null);
           handleTraceMessage(message);
           break;
         case 'final':
           // Process final message
           handleFinalMessage(webSocketMessage);
           break;
+        case 'cancelled':
+          requestIdRef.current = null;
+          setQueuePosition(null);
+          setIsProcessing(false);
+          setIsConnecting(false);
+          if (timeoutRef.current) {
+            clearTimeout(timeoutRef.current);
+            timeoutRef.current = null;
+          }
+          break;
         case 'error':
           // Reset states on error
+          setQueuePosition(null);
           setIsProcessing(false);
           setIsConnecting(false);
           onSafetyCheckError(webSocketMessage.safetyCheckResponse || 'Unknown error');
@@ -62,37 +103,54 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
     // Cleanup
     return () => {
       safetyCheckWebSocket.removeMessageHandler(handleMessage);
-      
+    };
+  }, [onSafetyCheckComplete, onSafetyCheckError]);
+
+  // Unmount only: the handler effect above re-runs whenever the parent passes
+  // new callbacks, which must not cancel the running check
+  useEffect(() => {
+    return () => {
+      // Stop the agents if the user navigates away mid-check
+      if (requestIdRef.current) {
+        safetyCheckWebSocket.cancelSafetyCheck(requestIdRef.current).catch(() => {});
+        requestIdRef.current = null;
+      }
+
       // Clear timeout when component unmounts
       if (timeoutRef.current) {
         clearTimeout(timeoutRef.current);
         timeoutRef.current = null;
       }
     };
-  }, [onSafetyCheckComplete, onSafetyCheckError]);
+  }, []);
 
   const handleTraceMessage = (message: WebSocketMessage) => {
     // Extract the actual message content (handle nested structure)
     const webSocketMessage = message.message ? message.message : message;
-    const content = webSocketMessage.content;
-    
-    if (!content) return;
-    
-    // Extract the rationale text if available
-    let rationale = null;
-    if (content.trace?.orchestrationTrace?.rationale?.text) {
-      rationale = content.trace.orchestrationTrace.rationale.text;
-    }
-    
-    // Only add to trace content if we have a rationale
-    if (rationale) {
-      // Append the new rationale to the existing trace content
-      setTraceContent(prev => {
-        // Add a separator if there's already content
-        const separator = prev ? '\n\n' : '';
-        return prev + separator + rationale;
-      });
-    }
+    // Trace frames are batched server-side; older frames carry a single trace in content
+    const traces = webSocketMessage.traces || (webSocketMessage.content ? [webSocketMessage.content] : []);
+
+    traces.forEach((content: any) => {
+      if (!content) return;
+
+      // Extract the rationale text if available (projected or raw trace)
+      let rationale = null;
+      if (content.rationale) {
+        rationale = content.rationale;
+      } else if (content.trace?.orchestrationTrace?.rationale?.text) {
+        rationale = content.trace.orchestrationTrace.rationale.text;
+      }
+
+      // Only add to trace content if we have a rationale
+      if (rationale) {
+        // Append the new rationale to the existing trace content
+        setTraceContent(prev => {
+          // Add a separator if there's already content
+          const separator = prev ? '\n\n' : '';
+          return prev + separator + rationale;
+        });
+      }
+    });
   };
 
   const handleFinalMessage = (message: WebSocketMessage) => {
@@ -100,6 +158,8 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
     
     // Mark that we've received the final response
     setFinalResponseReceived(true);
+    setServedFromCache(Boolean(message.cached));
+    requestIdRef.current = null;
     
     // Reset processing state
     setIsProcessing(false);
@@ -179,12 +239,25 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
     }
   };
 
-  const performSafetyCheck = async () => {
+  const cancelSafetyCheck = async () => {
+    if (!requestIdRef.current) return;
+    try {
+      await safetyCheckWebSocket.cancelSafetyCheck(requestIdRef.current);
+    } catch (error) {
+      console.error('Error cancelling safety check:', error);
+    }
+  };
+
+  // forceRefresh skips the server's briefing cache and runs the agents again
+  const performSafetyCheck = async (forceRefresh: boolean = false) => {
     try {
       // Reset state
       setIsProcessing(true);
+      setServedFromCache(false);
       setTraceContent("");
       setCurrentChunk("");
+      setSections([]);
+      setQueuePosition(null);
       setAuthError(null);
       setFinalResponseReceived(false);
 
@@ -215,7 +288,9 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
           longitude: workOrder.location_details?.longitude,
           target_datetime: workOrder.scheduled_start_timestamp,
         },
-        session_id: customAlphabet("1234567890", 20)()
+        session_id: customAlphabet("1234567890", 20)(),
+        traceLevel: 'rationale',
+        ...(forceRefresh ? { force_refresh: true } : {})
       };
 
       // The token will be automatically included by the WebSocket class
@@ -258,6 +333,12 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
     }
   };
 
+  // While processing, show the closed report sections, or the raw chunk stream
+  // until the first section closes. The finished briefing is only shown here
+  // when showResults is set; otherwise the parent renders it.
+  const liveResponse = sections.length > 0 ? sections.join('') : currentChunk;
+  const responseHtml = isProcessing ? liveResponse : (showResults ? currentChunk : '');
+
   return (
     <SpaceBetween direction="vertical" size="m">
       {authError && (
@@ -267,13 +348,25 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
       )}
       
       <Button 
-        onClick={performSafetyCheck} 
+        onClick={() => performSafetyCheck()} 
         loading={isConnecting || isProcessing}
         variant="primary"
         disabled={isProcessing || isConnecting}
       >
         {isConnecting ? 'Connecting...' : isProcessing ? 'Processing...' : 'Perform Safety Check'}
       </Button>
+
+      {isProcessing && (
+        <Button onClick={cancelSafetyCheck}>
+          Cancel
+        </Button>
+      )}
+
+      {!isProcessing && servedFromCache && (
+        <Button onClick={() => performSafetyCheck(true)}>
+          Run a fresh check
+        </Button>
+      )}
       
       {(isProcessing || (finalResponseReceived && showResults)) && (
         <div className="trace-container">
@@ -288,6 +381,13 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
             {/* i18n-enable */}
           </h3>}
 
+          {isProcessing && queuePosition !== null && (
+            <Box variant="p">
+              {/* i18n-disable */}
+              Waiting for a free slot, position {queuePosition} in line
+              {/* i18n-enable */}
+            </Box>
+          )}
           
           {/* Single continuous trace block */}
           <div className="agent-reasoning">
@@ -311,8 +411,7 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
             )}
           </div>
           
-          {/* Only show the response here if showResults is true */}
-          {currentChunk && showResults && (
+          {responseHtml && (
             <div className="current-response">
               <h4 className="subsection-heading">
                 {/* i18n-disable */}
@@ -321,11 +420,11 @@ const WebSocketSafetyCheck: React.FC<WebSocketSafetyCheckProps> = ({
               </h4>
               <div 
                 className="response-text" 
-                dangerouslySetInnerHTML={{ __html: currentChunk }}
+                dangerouslySetInnerHTML={{ __html: responseHtml }}
               />
             </div>
           )}
-          
+
           {isProcessing && (
             <div className="processing-indicator">
               <Spinner size="normal" /> Processing...
@@ -1,8 +1,8 @@
 import { useLocation, useNavigate } from 'react-router-dom';
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import '@components/WorkOrderDetails.css';
 import 'leaflet/dist/leaflet.css';
-import { postEmergencyCheckRequest } from '@lib/api';
+import { getWorkOrderBriefing, postEmergencyCheckRequest } from '@lib/api';
 import UnifiedMap from '@components/UnifiedMap';
 import { Emergency } from '@/types/emergency';
 import WebSocketSafetyCheck from '@components/WebSocketSafetyCheck';
@@ -34,6 +34,7 @@ interface WorkOrder {
   location_details?: LocationDetails;
   safetyCheckResponse?: string;
   safetyCheckPerformedAt?: string;
+  hasSafetyCheck?: boolean;
 }
 
 const WorkOrderDetails = () => {
@@ -48,6 +49,24 @@ const WorkOrderDetails = () => {
   
   const [emergencies, setEmergencies] = useState<Emergency[]>([]);
   const [loadingEmergencies, setLoadingEmergencies] = useState(false);
+
+  useEffect(() => {
+    // The work order list only flags stored briefings; load the HTML on demand.
+    // It is kept in component state, the router's work order is not modified
+    if (!workOrder?.hasSafetyCheck || workOrder.safetyCheckResponse) {
+      return;
+    }
+    let active = true;
+    getWorkOrderBriefing(workOrder.work_order_id).then(briefing => {
+      // Keep a briefing run in the meantime, and ignore a work order navigated away from
+      if (active && briefing?.safetyCheckResponse) {
+        setSafetyCheckResponse(current => current || briefing.safetyCheckResponse);
+      }
+    });
+    return () => {
+      active = false;
+    };
+  }, [workOrder?.work_order_id, workOrder?.hasSafetyCheck, workOrder?.safetyCheckResponse]);
   
   if (!workOrder) {
     return <div>
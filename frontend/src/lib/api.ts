@@ -4,17 +4,11 @@
 
 import { Amplify } from "aws-amplify";
 import { fetchAuthSession } from "aws-amplify/auth";
-import { post } from "aws-amplify/api";
+import { get, post } from "aws-amplify/api";
 import { getErrorMessage } from "./utils";
 import { QueryObject,EmergencyCheckQuery } from "@/types";
 import { config } from "./config";
 
-interface WorkOrderResponse {
-  body: {
-    json(): Promise<WorkOrder[]>;
-  }
-}
-
 export interface WorkOrder {
   work_order_id: string;
   asset_id: string;
@@ -24,6 +18,8 @@ export interface WorkOrder {
   priority: number;
   safetycheckresponse: string
   safetyCheckPerformedAt: string;
+  hasSafetyCheck?: boolean;
+  updated_at?: number;
   scheduled_start_timestamp: string;
   scheduled_finish_timestamp: string;
   status: string;
@@ -38,13 +34,21 @@ export interface WorkOrder {
 
 // WebSocket message interface
 export interface WebSocketMessage {
-  type: 'chunk' | 'trace' | 'status' | 'final' | 'error';
+  type: 'chunk' | 'trace' | 'section' | 'status' | 'final' | 'error' | 'fragment' | 'cancelled' | 'queued';
   content?: string;
   message?: string;
   status?: string;
   traceType?: string;
   requestId?: string;
   safetycheckresponse?: string;
+  traces?: any[];
+  seq?: number;
+  cached?: boolean;
+  title?: string;
+  html?: string;
+  reason?: string;
+  jobId?: string;
+  position?: number;
 }
 
 // Use runtime config instead of env variables
@@ -107,6 +111,9 @@ const getRestInput = async (apiName: string) => {
     options: {
       headers: {
         Authorization: `Bearer ${authToken}`,
+        // API Gateway only passes gzipped bodies through as binary when the
+        // first Accept type is a binary media type (application/json)
+        Accept: 'application/json',
       },
     },
   };
@@ -133,34 +140,172 @@ export async function postSafetyCheckRequest(queryObject: QueryObject) {
   }
 }
 
-interface WorkOrderResponse {
-  body: {
-    json(): Promise<WorkOrder[]>;
-  }
+
+export interface WorkOrderPage {
+  items: WorkOrder[];
+  next_cursor: string | null;
 }
 
+const WORK_ORDER_PAGE_SIZE = 100;
+
+// Served from indexes: owner and/or status, optionally within a scheduled start window
+export interface WorkOrderFilters {
+  owner?: string;
+  status?: string;
+  from?: string;
+  to?: string;
+  // Sparse fieldset; the default, full, returns every attribute
+  fields?: 'list' | 'map' | 'full';
+}
 
-export async function postWorkOrderQuery(): Promise<WorkOrder[]> {
+// Last page and ETag per request, revalidated with If-None-Match
+const workOrderPageCache: Record<string, { etag: string; page: WorkOrderPage }> = {};
+
+export async function postWorkOrderPage(cursor: string | null, limit: number = WORK_ORDER_PAGE_SIZE, filters: WorkOrderFilters = {}): Promise<WorkOrderPage> {
+  const body = { ...filters, limit, ...(cursor ? { cursor } : {}) };
+  const cacheKey = JSON.stringify(body);
+  const cached = workOrderPageCache[cacheKey];
+  const restInput = await getRestInput(config.WorkOrder_API_NAME);
+  const restOperation = post({
+    ...restInput,
+    path: `workorders`,
+    options: {
+      ...restInput.options,
+      headers: {
+        ...restInput.options.headers,
+        ...(cached ? { 'If-None-Match': cached.etag } : {})
+      },
+      body
+    }
+  });
   try {
+    const response = await restOperation.response;
+    const page = (await response.body.json()) as unknown as WorkOrderPage;
+    const etag = response.headers['etag'];
+    if (etag) {
+      workOrderPageCache[cacheKey] = { etag, page };
+    }
+    return page;
+  } catch (e: any) {
+    // Unchanged since the last fetch
+    if (cached && e?.response?.statusCode === 304) {
+      return cached.page;
+    }
+    throw e;
+  }
+}
+
+export interface WorkOrderDelta {
+  items: WorkOrder[];
+  tombstones: { work_order_id: string; updated_at: number }[];
+  watermark: number;
+}
+
+interface WorkOrderDeltaPage extends WorkOrderDelta {
+  next_cursor: string | null;
+}
+
+// Latest updated_at in a list, to start delta syncs from
+export function getWorkOrderWatermark(workOrders: WorkOrder[]): number {
+  return workOrders.reduce((latest, order) => Math.max(latest, order.updated_at ?? 0), 0);
+}
+
+// Work orders changed or deleted since the watermark, across every delta page
+export async function syncWorkOrders(since: number): Promise<WorkOrderDelta> {
+  const delta: WorkOrderDelta = { items: [], tombstones: [], watermark: since };
+  let cursor: string | null = null;
+  do {
     const restInput = await getRestInput(config.WorkOrder_API_NAME);
     const restOperation = post({
       ...restInput,
       path: `workorders`,
       options: {
         ...restInput.options,
-        body: {} // Changed from empty string to empty object
+        body: { since, limit: WORK_ORDER_PAGE_SIZE, ...(cursor ? { cursor } : {}) }
       }
     });
-    const response = await (restOperation.response as unknown) as WorkOrderResponse;
-    
-    // Add null check and provide default empty array
-    return response.body.json() ?? [];
+    const response = await restOperation.response;
+    const page = (await response.body.json()) as unknown as WorkOrderDeltaPage;
+    delta.items.push(...(page.items ?? []));
+    delta.tombstones.push(...(page.tombstones ?? []));
+    delta.watermark = Math.max(delta.watermark, page.watermark);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return delta;
+}
+
+// Applies a delta to a list, replacing changed work orders and dropping deleted ones
+export function applyWorkOrderDelta(workOrders: WorkOrder[], delta: WorkOrderDelta): WorkOrder[] {
+  const byId = new Map(workOrders.map(order => [order.work_order_id, order]));
+  delta.items.forEach(order => byId.set(order.work_order_id, order));
+  delta.tombstones.forEach(tombstone => byId.delete(tombstone.work_order_id));
+  return Array.from(byId.values());
+}
+
+// The last loaded list and its watermark, kept while the app is open
+let workOrderSnapshot: { workOrders: WorkOrder[]; watermark: number } | null = null;
+
+// Loads the work order list: a full download the first time, then only the
+// changes since the last load. onPage is only called during a full download.
+export async function refreshWorkOrders(onPage?: (items: WorkOrder[]) => void): Promise<WorkOrder[]> {
+  if (workOrderSnapshot) {
+    const delta = await syncWorkOrders(workOrderSnapshot.watermark);
+    const workOrders = sortWorkOrders(applyWorkOrderDelta(workOrderSnapshot.workOrders, delta));
+    workOrderSnapshot = { workOrders, watermark: delta.watermark };
+    return workOrders;
+  }
+  const workOrders = sortWorkOrders(await postWorkOrderQuery(onPage));
+  workOrderSnapshot = { workOrders, watermark: getWorkOrderWatermark(workOrders) };
+  return workOrders;
+}
+
+// Unfiltered pages arrive in table scan order, so combined pages are sorted on the client
+export function sortWorkOrders(workOrders: WorkOrder[]): WorkOrder[] {
+  return [...workOrders].sort((a, b) => a.work_order_id.localeCompare(b.work_order_id));
+}
+
+// Pages through every work order; onPage is called as each page arrives
+export async function postWorkOrderQuery(onPage?: (items: WorkOrder[]) => void, filters: WorkOrderFilters = {}): Promise<WorkOrder[]> {
+  try {
+    const workOrders: WorkOrder[] = [];
+    let cursor: string | null = null;
+    do {
+      const page = await postWorkOrderPage(cursor, WORK_ORDER_PAGE_SIZE, filters);
+      const items = page.items ?? [];
+      workOrders.push(...items);
+      onPage?.(items);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return workOrders;
   } catch (e: unknown) {
     console.log("postWorkOrderQuery call failed: ", getErrorMessage(e));
     throw e;
   }
 }
 
+export interface WorkOrderBriefing {
+  work_order_id: string;
+  safetyCheckResponse: string;
+  safetyCheckPerformedAt: string;
+  safetyCheckDigest?: string;
+}
+
+// Briefings are not included in the work order list; fetch one on demand
+export async function getWorkOrderBriefing(workOrderId: string): Promise<WorkOrderBriefing | null> {
+  try {
+    const restInput = await getRestInput(config.WorkOrder_API_NAME);
+    const restOperation = get({
+      ...restInput,
+      path: `workorders/${encodeURIComponent(workOrderId)}/briefing`,
+    });
+    const response = await restOperation.response;
+    return (await response.body.json()) as unknown as WorkOrderBriefing;
+  } catch (e: unknown) {
+    console.log("getWorkOrderBriefing call failed: ", getErrorMessage(e));
+    return null;
+  }
+}
+
 export async function pollSafetyCheckStatus(requestId: string) {
   try {
       const restInput = await getRestInput(config.API_NAME);
@@ -209,6 +354,11 @@ class SafetyCheckWebSocket {
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectTimeout: NodeJS.Timeout | null = null;
+  // Keeps the connection's server-side registry entry from expiring
+  private heartbeatInterval: NodeJS.Timeout | null = null;
+  private heartbeatIntervalMs = 4 * 60 * 1000;
+  // Fragments of oversized messages, keyed by fragmentId
+  private fragments: Record<string, string[]> = {};
 
   constructor() {
     this.connect = this.connect.bind(this);
@@ -239,13 +389,26 @@ class SafetyCheckWebSocket {
           console.log('WebSocket connected');
           this.isConnected = true;
           this.reconnectAttempts = 0;
+          this.startHeartbeat();
           resolve();
         };
 
         this.socket.onmessage = (event) => {
           try {
-            const message = JSON.parse(event.data) as WebSocketMessage;
-            this.messageHandlers.forEach(handler => handler(message));
+            let message = JSON.parse(event.data);
+            const fragment = message.message;
+            if (fragment?.type === 'fragment') {
+              // Reassemble once every fragment has arrived, then dispatch the original message
+              const parts = this.fragments[fragment.fragmentId] || new Array(fragment.total);
+              parts[fragment.seq] = fragment.data;
+              this.fragments[fragment.fragmentId] = parts;
+              if (parts.filter(part => part !== undefined).length < fragment.total) {
+                return;
+              }
+              delete this.fragments[fragment.fragmentId];
+              message = JSON.parse(parts.join(''));
+            }
+            this.messageHandlers.forEach(handler => handler(message as WebSocketMessage));
           } catch (error) {
             console.error('Error parsing WebSocket message:', error);
           }
@@ -254,6 +417,7 @@ class SafetyCheckWebSocket {
         this.socket.onclose = () => {
           console.log('WebSocket disconnected');
           this.isConnected = false;
+          this.stopHeartbeat();
           this.attemptReconnect();
         };
 
@@ -270,6 +434,22 @@ class SafetyCheckWebSocket {
     });
   }
 
+  private startHeartbeat() {
+    this.stopHeartbeat();
+    this.heartbeatInterval = setInterval(() => {
+      if (this.socket && this.isConnected) {
+        this.socket.send(JSON.stringify({ action: 'safetyCheck', messageType: 'heartbeat' }));
+      }
+    }, this.heartbeatIntervalMs);
+  }
+
+  private stopHeartbeat() {
+    if (this.heartbeatInterval) {
+      clearInterval(this.heartbeatInterval);
+      this.heartbeatInterval = null;
+    }
+  }
+
   private attemptReconnect() {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
       this.reconnectAttempts++;
@@ -292,6 +472,7 @@ class SafetyCheckWebSocket {
   }
 
   public disconnect(): void {
+    this.stopHeartbeat();
     if (this.socket) {
       this.socket.close();
       this.socket = null;
@@ -325,6 +506,10 @@ class SafetyCheckWebSocket {
     await this.sendMessage('safetyCheck', queryObject);
   }
 
+  public async cancelSafetyCheck(requestId: string): Promise<void> {
+    await this.sendMessage('safetyCheck', { messageType: 'cancel', requestId });
+  }
+
   public addMessageHandler(handler: (message: WebSocketMessage) => void): void {
     this.messageHandlers.push(handler);
   }